@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+"""
+Todo List Benchmarks
+Timing scripts for the TaskManager data structures.
+
+Run all benchmarks, or pick some by name:
+    python benchmarks.py
+    python benchmarks.py lookup
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+from typing import Callable, Dict, List
+
+from rendering import OUTPUT_FORMATS, TaskRenderer
+from storage import (BinaryStorage, JournalStorage, JsonFileStorage, MemoryStorage, ShardedStorage,
+                     SqliteStorage)
+from todo_app import Task, TaskManager
+from transfer import TRANSFER_FORMATS, read_tasks, write_tasks
+from validation import TaskValidator
+
+
+def make_manager(count: int, columnar: bool = False) -> TaskManager:
+    """Create an in-memory TaskManager holding ``count`` tasks."""
+    manager = TaskManager(storage=MemoryStorage(), columnar=columnar)
+    priorities = ["High", "Medium", "Low"]
+    categories = ["General", "Work", "Home", "Learning", "Errands"]
+    for i in range(count):
+        due_date = f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}" if i % 4 else None
+        manager.add_task(f"Task number {i}", priorities[i % 3], due_date, categories[i % 5])
+    return manager
+
+
+def time_per_op(func: Callable, args: List) -> float:
+    """Call ``func`` once per argument and return microseconds per call."""
+    start = time.perf_counter()
+    for arg in args:
+        func(arg)
+    return (time.perf_counter() - start) / len(args) * 1e6
+
+
+def bench_lookup(sizes: List[int] = (1_000, 10_000, 100_000, 1_000_000), ops: int = 10_000):
+    """get_task, complete_task and delete_task should cost the same at any size."""
+    print("=== Lookup / complete / delete (microseconds per operation) ===")
+    print(f"{'tasks':>10s} | {'get':>8s} | {'complete':>8s} | {'delete':>8s}")
+    for size in sizes:
+        manager = make_manager(size)
+        ids = random.sample(range(1, size + 1), min(ops, size))
+        get_us = time_per_op(manager.get_task, ids)
+        complete_us = time_per_op(manager.complete_task, ids)
+        delete_us = time_per_op(manager.delete_task, ids)
+        print(f"{size:10d} | {get_us:8.2f} | {complete_us:8.2f} | {delete_us:8.2f}")
+
+
+def bench_list(sizes: List[int] = (10_000, 100_000, 1_000_000), selected: int = 100):
+    """Filtered listing should cost the size of the result, not the list."""
+    print("=== Filtered list_tasks (milliseconds per query) ===")
+    print(f"{'tasks':>10s} | {'results':>8s} | {'indexed':>8s} | {'scan':>8s}")
+    for size in sizes:
+        manager = make_manager(size)
+        for task_id in range(1, size + 1, size // selected):
+            manager.complete_task(task_id)
+        
+        def scan():
+            return [t for t in manager.tasks
+                    if t.priority.lower() == "high" and t.completed
+                    and t.category.lower() == "general"]
+        
+        def indexed():
+            return manager.list_tasks("High", "complete", "General")
+        
+        results = indexed()
+        assert results == scan()
+        indexed_ms = time_per_op(lambda _: indexed(), range(20)) / 1000
+        scan_ms = time_per_op(lambda _: scan(), range(3)) / 1000
+        print(f"{size:10d} | {len(results):8d} | {indexed_ms:8.3f} | {scan_ms:8.2f}")
+
+
+def bench_paging(sizes: List[int] = (100_000, 1_000_000), page_size: int = 20):
+    """One sorted page from list_page() against sorting the whole result."""
+    print(f"=== Sorted pages of {page_size} (milliseconds per page) ===")
+    print(f"{'tasks':>10s} | {'sort':>8s} | {'first':>8s} | {'cursor':>8s} | {'sort all':>8s}")
+    for size in sizes:
+        manager = make_manager(size)
+        for sort in ("priority", "due"):
+            sort_key = manager._sort_key(sort)
+            
+            def key(task):
+                return sort_key(task), task.id
+            
+            first, cursor = manager.list_page(status="incomplete", sort=sort, limit=page_size)
+            
+            def sort_all():
+                return sorted(manager.list_tasks(status="incomplete"), key=key)[:page_size]
+            
+            assert first == sort_all()
+            first_ms = time_per_op(lambda _: manager.list_page(
+                status="incomplete", sort=sort, limit=page_size), range(3)) / 1000
+            cursor_ms = time_per_op(lambda _: manager.list_page(
+                status="incomplete", sort=sort, limit=page_size, cursor=cursor), range(3)) / 1000
+            sort_ms = time_per_op(lambda _: sort_all(), range(3)) / 1000
+            print(f"{size:10d} | {sort:>8s} | {first_ms:8.3f} | {cursor_ms:8.3f} | {sort_ms:8.1f}")
+
+
+def bench_search(sizes: List[int] = (10_000, 100_000, 500_000)):
+    """Indexed search against the old lowercase-and-scan approach."""
+    print("=== search_tasks (milliseconds per query) ===")
+    print(f"{'tasks':>10s} | {'query':>14s} | {'results':>8s} | {'indexed':>8s} | {'scan':>8s}")
+    for size in sizes:
+        manager = make_manager(size)
+        manager.search_tasks("warm up")  # builds the index
+        for query, all_terms in (("number 4242", False), ("4242 task", True)):
+            def scan():
+                words = query.lower().split() if all_terms else [query.lower()]
+                return [t for t in manager.tasks
+                        if all(w in t.description.lower() for w in words)]
+            
+            results = manager.search_tasks(query, all_terms)
+            assert results == scan()
+            indexed_ms = time_per_op(lambda _: manager.search_tasks(query, all_terms), range(50)) / 1000
+            scan_ms = time_per_op(lambda _: scan(), range(3)) / 1000
+            print(f"{size:10d} | {query:>14s} | {len(results):8d} | {indexed_ms:8.3f} | {scan_ms:8.2f}")
+
+
+def bench_due(sizes: List[int] = (100_000, 1_000_000)):
+    """upcoming() and overdue() against sorting every task by due date."""
+    print("=== Due-date queries (milliseconds per query) ===")
+    print(f"{'tasks':>10s} | {'query':>12s} | {'results':>8s} | {'indexed':>8s} | {'sort':>8s}")
+    today = date(2024, 3, 1)
+    for size in sizes:
+        manager = make_manager(size)
+        manager.upcoming(1, today)  # builds the index
+        
+        def sort_upcoming():
+            due = [t for t in manager.tasks if not t.completed and t.due_ordinal
+                   and t.due_ordinal >= today.toordinal()]
+            return sorted(due, key=lambda t: (t.due_ordinal, t.id))[:20]
+        
+        def sort_overdue():
+            due = [t for t in manager.tasks if not t.completed and t.due_ordinal
+                   and t.due_ordinal < today.toordinal()]
+            return sorted(due, key=lambda t: (t.due_ordinal, t.id))
+        
+        for name, indexed, scan in (("upcoming 20", lambda: manager.upcoming(20, today), sort_upcoming),
+                                    ("overdue", lambda: manager.overdue(today), sort_overdue)):
+            results = indexed()
+            assert results == scan()
+            indexed_ms = time_per_op(lambda _: indexed(), range(20)) / 1000
+            scan_ms = time_per_op(lambda _: scan(), range(3)) / 1000
+            print(f"{size:10d} | {name:>12s} | {len(results):8d} | {indexed_ms:8.3f} | {scan_ms:8.2f}")
+
+
+def bench_render(size: int = 100_000):
+    """Printing a large listing row by row against the batched renderer."""
+    print(f"=== Rendering {size} tasks to a file (milliseconds) ===")
+    tasks = make_manager(size).tasks
+    with open(os.devnull, 'w', encoding='utf-8') as devnull:
+        def print_rows():
+            with contextlib.redirect_stdout(devnull):
+                for task in tasks:
+                    print(task)
+        
+        print_ms = time_per_op(lambda _: print_rows(), range(3)) / 1000
+        print(f"{'print(task)':>14s}: {print_ms:8.1f}")
+        for output_format in OUTPUT_FORMATS:
+            renderer = TaskRenderer(output_format, devnull)
+            render_ms = time_per_op(lambda _: renderer.render(tasks), range(3)) / 1000
+            print(f"{output_format:>14s}: {render_ms:8.1f}")
+
+
+class DictTask:
+    """The original dict-backed Task layout, kept for memory comparisons."""
+    
+    def __init__(self, description, priority="Medium", due_date=None, category="General"):
+        self.id = None
+        self.description = description
+        self.completed = False
+        self.priority = priority
+        self.created_date = time.strftime("%Y-%m-%d")
+        self.due_date = due_date
+        self.category = category
+
+
+def bytes_per_task(task_class, count: int) -> float:
+    """Measure the memory allocated per task for ``count`` tasks."""
+    tracemalloc.start()
+    tasks = []
+    for i in range(count):
+        task = task_class(f"Task number {i}", "Medium", f"2024-{i % 12 + 1:02d}-15", "Work")
+        task.id = i
+        tasks.append(task)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return allocated / count
+
+
+def bench_memory(count: int = 200_000):
+    """Bytes per task for the dict-backed layout and the slotted Task."""
+    print(f"=== Memory per task ({count} tasks) ===")
+    before = bytes_per_task(DictTask, count)
+    after = bytes_per_task(Task, count)
+    print(f"dict-backed Task: {before:7.1f} bytes")
+    print(f"slotted Task:     {after:7.1f} bytes ({(1 - after / before) * 100:.0f}% smaller)")
+
+
+def bench_columnar(sizes: List[int] = (100_000, 1_000_000)):
+    """Columnar scans against Python loops over Task objects."""
+    print("=== Columnar store (milliseconds per call) ===")
+    print(f"{'tasks':>10s} | {'operation':>22s} | {'columnar':>9s} | {'objects':>9s}")
+    for size in sizes:
+        manager = make_manager(size, columnar=True)
+        for task_id in range(1, size + 1, 3):
+            manager.complete_task(task_id)
+        tasks = manager.tasks
+        
+        def loop_stats():
+            completed = sum(1 for t in tasks if t.completed)
+            priorities = {}
+            for t in tasks:
+                priorities[t.priority] = priorities.get(t.priority, 0) + 1
+            return completed, priorities
+        
+        def loop_list():
+            return [t for t in tasks if t.priority == "High" and not t.completed
+                    and t.category == "Work"]
+        
+        start, end = date(2024, 3, 1).toordinal(), date(2024, 3, 31).toordinal()
+        
+        def loop_due():
+            return sum(1 for t in tasks if t.due_ordinal and start <= t.due_ordinal <= end)
+        
+        columns = manager.columns
+        cases = [
+            ("get_statistics", manager.get_statistics, loop_stats),
+            ("list High/incomplete/Work", lambda: manager.list_tasks("High", "incomplete", "Work"), loop_list),
+            ("count due in March", lambda: columns.count(due_from=start, due_to=end), loop_due),
+        ]
+        for name, columnar_call, loop_call in cases:
+            columnar_ms = time_per_op(lambda _: columnar_call(), range(3)) / 1000
+            loop_ms = time_per_op(lambda _: loop_call(), range(3)) / 1000
+            print(f"{size:10d} | {name:>22s} | {columnar_ms:9.2f} | {loop_ms:9.2f}")
+
+
+def bench_bulk_add(sizes: List[int] = (500, 1_000, 2_000, 50_000)):
+    """Importing through add_task() one by one against one add_tasks() commit."""
+    print("=== Bulk import into a JSON file (seconds) ===")
+    print(f"{'tasks':>10s} | {'add_task loop':>13s} | {'add_tasks':>9s}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            rows = [{'description': f"Imported task {i}", 'category': "Import"} for i in range(size)]
+            
+            loop_seconds = "skipped"
+            if size <= 2_000:
+                path = os.path.join(directory, f"loop-{size}.json")
+                manager = TaskManager(path, JsonFileStorage(path, fsync='never'))
+                start = time.perf_counter()
+                for row in rows:
+                    manager.add_task(**row)
+                loop_seconds = f"{time.perf_counter() - start:13.2f}"
+            
+            path = os.path.join(directory, f"bulk-{size}.json")
+            manager = TaskManager(path, JsonFileStorage(path, fsync='never'))
+            start = time.perf_counter()
+            manager.add_tasks(rows)
+            bulk_seconds = time.perf_counter() - start
+            print(f"{size:10d} | {loop_seconds:>13s} | {bulk_seconds:9.2f}")
+
+
+def write_task_file(path: str, megabytes: int):
+    """Write a tasks.json of roughly the given size."""
+    record = {'id': 0, 'description': "", 'completed': False, 'priority': "Medium",
+              'created_date': "2024-01-01", 'due_date': "2024-02-01", 'category': "Work"}
+    target = megabytes * 1024 * 1024
+    written = 0
+    with open(path, 'w') as f:
+        f.write("[\n")
+        task_id = 0
+        while written < target:
+            task_id += 1
+            record['id'] = task_id
+            record['description'] = f"Generated task {task_id} for the startup benchmark"
+            line = ("  " if task_id == 1 else ",\n  ") + json.dumps(record)
+            f.write(line)
+            written += len(line)
+        f.write("\n]")
+
+
+class WholeFileStorage(JsonFileStorage):
+    """The original loader: parse the whole file with json.load first."""
+    
+    def load(self):
+        with open(self.path) as f:
+            return json.load(f)
+
+
+def bench_startup(megabytes: int = 50):
+    """Startup time and peak memory loading a large tasks.json (try 500 MB)."""
+    print(f"=== Startup on a {megabytes} MB tasks.json ===")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "tasks.json")
+        write_task_file(path, megabytes)
+        
+        binary_path = os.path.join(directory, "tasks.bin")
+        BinaryStorage(binary_path).save(TaskManager(path, JsonFileStorage(path)).tasks)
+        
+        def whole_file():
+            return TaskManager(path, WholeFileStorage(path))
+        
+        def streaming():
+            return TaskManager(path, JsonFileStorage(path))
+        
+        def binary():
+            return TaskManager(binary_path, BinaryStorage(binary_path))
+        
+        def snapshot_lookup():
+            snapshot = BinaryStorage(binary_path).open_snapshot()
+            task = snapshot.get(len(snapshot) // 2)
+            snapshot.close()
+            return task
+        
+        for name, load in (("json.load", whole_file), ("streaming", streaming),
+                           ("binary", binary), ("mmap get", snapshot_lookup)):
+            start = time.perf_counter()
+            load()
+            seconds = time.perf_counter() - start
+            tracemalloc.start()
+            result = load()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del result
+            print(f"{name:10s}: {seconds:8.4f} s, peak {peak / 2 ** 20:7.1f} MB")
+
+
+def bench_sqlite(sizes: List[int] = (10_000, 100_000), edits: int = 20):
+    """Cost of one edit per backend, and SQLite's pushed-down queries."""
+    print("=== Single edit per backend (milliseconds per complete_task) ===")
+    print(f"{'tasks':>10s} | {'json':>8s} | {'journal':>8s} | {'sqlite':>8s}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            rows = [{'description': f"Task number {i}", 'priority': ("High", "Medium", "Low")[i % 3],
+                     'category': ("Work", "Home", "Errands")[i % 3]} for i in range(size)]
+            managers = {}
+            for name, backend in (("json", JsonFileStorage), ("journal", JournalStorage),
+                                  ("sqlite", SqliteStorage)):
+                path = os.path.join(directory, f"{name}-{size}")
+                managers[name] = TaskManager(path, backend(path, fsync='never'))
+                managers[name].add_tasks(rows)
+            ids = random.sample(range(1, size + 1), edits)
+            timings = [time_per_op(managers[name].complete_task, ids) / 1000
+                       for name in ("json", "journal", "sqlite")]
+            print(f"{size:10d} | {timings[0]:8.2f} | {timings[1]:8.2f} | {timings[2]:8.2f}")
+            
+            manager = managers["sqlite"]
+            for name, query in (("list", lambda: manager.list_tasks("High", "complete", "Work")),
+                                ("search", lambda: manager.search_tasks("number 4242")),
+                                ("stats", manager.get_statistics)):
+                query_ms = time_per_op(lambda _: query(), range(20)) / 1000
+                print(f"{'':10s}   sqlite {name:6s}: {query_ms:8.3f} ms")
+            for manager in managers.values():
+                manager.storage.close()
+
+
+def bench_refresh(size: int = 100_000):
+    """refresh() against load_tasks() when another process edits one task."""
+    print(f"=== Picking up an external edit ({size} tasks, milliseconds) ===")
+    print(f"{'backend':>10s} | {'load_tasks':>10s} | {'unchanged':>10s} | {'one edit':>10s}")
+    rows = [{'description': f"Task number {i}"} for i in range(size)]
+    with tempfile.TemporaryDirectory() as directory:
+        for name, backend in (("json", JsonFileStorage), ("journal", JournalStorage),
+                              ("binary", BinaryStorage), ("sqlite", SqliteStorage)):
+            path = os.path.join(directory, name)
+            reader = TaskManager(path, backend(path, fsync='never'))
+            writer = TaskManager(path, backend(path, fsync='never'))
+            writer.add_tasks(rows)
+            reader.refresh()
+            
+            load_ms = time_per_op(lambda _: reader.load_tasks(), range(3)) / 1000
+            unchanged_ms = time_per_op(lambda _: reader.refresh(), range(100)) / 1000
+            
+            def edit_and_refresh(task_id):
+                writer.complete_task(task_id)
+                start = time.perf_counter()
+                reader.refresh()
+                return time.perf_counter() - start
+            
+            edit_ms = sum(edit_and_refresh(task_id) for task_id in range(1, 6)) / 5 * 1000
+            print(f"{name:>10s} | {load_ms:10.2f} | {unchanged_ms:10.3f} | {edit_ms:10.2f}")
+            reader.storage.close()
+            writer.storage.close()
+
+
+def bench_recurrence(rules: int = 10_000):
+    """Expanding recurring tasks over a window, against storing every occurrence."""
+    print(f"=== Recurring tasks ({rules} rules) ===")
+    kinds = ["daily", "weekly", "every 2 weeks", "monthly", "every 3 months",
+             "yearly", "cron * * mon-fri", "cron 1,15 * *"]
+    manager = TaskManager(storage=MemoryStorage())
+    rng = random.Random(1)
+    manager.add_tasks({'description': f"Chore {i}", 'recurrence': kinds[i % len(kinds)],
+                       'due_date': date.fromordinal(date(2024, 1, 1).toordinal()
+                                                    + rng.randrange(366)).isoformat()}
+                      for i in range(rules))
+    
+    for name, start, end in (("one week", date(2025, 3, 3), date(2025, 3, 9)),
+                             ("one month", date(2025, 3, 1), date(2025, 3, 31)),
+                             ("one year", date(2025, 1, 1), date(2025, 12, 31))):
+        started = time.perf_counter()
+        occurrences = manager.occurrences(start, end)
+        seconds = time.perf_counter() - started
+        print(f"{name:>10s}: {len(occurrences):9,d} occurrences in {seconds * 1000:8.1f} ms "
+              f"({len(occurrences) / seconds:,.0f}/s)")
+    # The first call indexes every series by its next date; later ones only
+    # move on the series whose date has passed since the previous call
+    first_ms = time_per_op(lambda _: manager.upcoming(20, date(2025, 6, 1)), range(1)) / 1000
+    same_ms = time_per_op(lambda _: manager.upcoming(20, date(2025, 6, 1)), range(100)) / 1000
+    next_ms = time_per_op(lambda day: manager.upcoming(20, date(2025, 6, day)), range(2, 30)) / 1000
+    print(f"{'upcoming':>10s}: next 20 due in {first_ms:.1f} ms first, {same_ms:.3f} ms again, "
+          f"{next_ms:.1f} ms a day later")
+    
+    # File size with one record per rule, and with one record per occurrence of a year
+    occurrences = manager.occurrences(date(2025, 1, 1), date(2025, 12, 31))
+    rule_bytes = sum(len(json.dumps(task.to_dict())) for task in manager.tasks)
+    sample = occurrences[:1000]
+    occurrence_bytes = sum(len(json.dumps(task.to_dict())) for task in sample) / len(sample)
+    print(f"{'json size':>10s}: {rule_bytes / 1e6:.1f} MB as rules, "
+          f"~{occurrence_bytes * len(occurrences) / 1e6:.0f} MB as a year of separate tasks")
+
+
+def bench_transfer(size: int = 200_000):
+    """Streaming export and import in CSV and JSON Lines, in records per second."""
+    print(f"=== Import and export ({size} tasks) ===")
+    print(f"{'format':>8s} | {'file MB':>8s} | {'export/s':>10s} | {'import/s':>10s}")
+    source = make_manager(size)
+    with tempfile.TemporaryDirectory() as directory:
+        for fmt in TRANSFER_FORMATS:
+            path = os.path.join(directory, f"tasks.{fmt}")
+            start = time.perf_counter()
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                write_tasks(f, source.tasks, fmt)
+            export_seconds = time.perf_counter() - start
+            
+            target = TaskManager(storage=MemoryStorage())
+            start = time.perf_counter()
+            with open(path, encoding='utf-8', newline='') as f:
+                added, _ = target.import_tasks(read_tasks(f, fmt))
+            import_seconds = time.perf_counter() - start
+            print(f"{fmt:>8s} | {os.path.getsize(path) / 1e6:8.1f} | "
+                  f"{size / export_seconds:10,.0f} | {added / import_seconds:10,.0f}")
+
+
+def bench_validation(sizes: List[int] = (1_000, 10_000, 100_000)):
+    """Checking priority, due date and category row by row against TaskValidator columns."""
+    print("=== Input validation (rows per second) ===")
+    print(f"{'rows':>8s} | {'per row':>10s} | {'columns':>10s} | {'speedup':>8s}")
+    for size in sizes:
+        rng = random.Random(size)
+        priorities = [rng.choice(("High", "Medium", "Low", "Urgent")) for _ in range(size)]
+        due_dates = [f"2024-{rng.randint(1, 13):02d}-{rng.randint(1, 31):02d}"
+                     for _ in range(size)]
+        categories = [rng.choice(("General", "Work", "Home", "")) for _ in range(size)]
+        
+        start = time.perf_counter()
+        invalid = 0
+        for priority, due_date in zip(priorities, due_dates):
+            # What handle_add did for every task before TaskValidator
+            if priority not in ['High', 'Medium', 'Low']:
+                invalid += 1
+                continue
+            try:
+                datetime.strptime(due_date, '%Y-%m-%d')
+            except ValueError:
+                invalid += 1
+        row_seconds = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        masks = TaskValidator().check(priorities, due_dates, categories)
+        column_seconds = time.perf_counter() - start
+        assert invalid <= sum(map(bool, masks))
+        print(f"{size:8d} | {size / row_seconds:10,.0f} | {size / column_seconds:10,.0f} | "
+              f"{row_seconds / column_seconds:7.1f}x")
+
+
+def bench_shards(size: int = 100_000, categories: int = 20, runs: int = 5):
+    """One CLI-style command (fresh TaskManager) on json against sharded storage."""
+    print(f"=== One command per process ({size} tasks, {categories} categories, milliseconds) ===")
+    print(f"{'backend':>8s} | {'complete':>10s} | {'list -c':>10s} | {'list all':>10s}")
+    names = [f"Category {number}" for number in range(categories)]
+    rows = [{'description': f"Task number {i}", 'category': names[i % categories]}
+            for i in range(size)]
+    with tempfile.TemporaryDirectory() as directory:
+        for name, backend, path in (
+                ("json", JsonFileStorage, os.path.join(directory, "tasks.json")),
+                ("sharded", ShardedStorage, os.path.join(directory, "shards", "manifest.json"))):
+            TaskManager(path, backend(path, fsync='never')).add_tasks(rows)
+            
+            def command(run: Callable[[TaskManager], object]) -> float:
+                start = time.perf_counter()
+                for _ in range(runs):
+                    run(TaskManager(path, backend(path, fsync='never')))
+                return (time.perf_counter() - start) / runs * 1000
+            
+            timings = (command(lambda manager: manager.complete_task(random.randint(1, size))),
+                       command(lambda manager: manager.list_tasks(category=names[3])),
+                       command(lambda manager: manager.list_tasks()))
+            print(f"{name:>8s} | {timings[0]:10.1f} | {timings[1]:10.1f} | {timings[2]:10.1f}")
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    'lookup': bench_lookup,
+    'list': bench_list,
+    'paging': bench_paging,
+    'search': bench_search,
+    'due': bench_due,
+    'render': bench_render,
+    'memory': bench_memory,
+    'columnar': bench_columnar,
+    'bulk_add': bench_bulk_add,
+    'startup': bench_startup,
+    'sqlite': bench_sqlite,
+    'refresh': bench_refresh,
+    'recurrence': bench_recurrence,
+    'transfer': bench_transfer,
+    'validation': bench_validation,
+    'shards': bench_shards,
+}
+
+
+def main():
+    """Run the selected benchmarks."""
+    parser = argparse.ArgumentParser(description="TaskManager benchmarks")
+    parser.add_argument('names', nargs='*',
+                        help=f"Benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    options = parser.parse_args()
+    for name in options.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark '{name}'")
+    for name in options.names or BENCHMARKS:
+        BENCHMARKS[name]()
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Columnar Task Store
+A struct-of-arrays copy of the task list for bulk filtering and reporting.
+
+Each task field lives in its own typed column (``bytearray`` or ``array``),
+and descriptions are packed into one UTF-8 byte heap. Filters produce a byte
+mask with one 0/1 byte per row, built and combined with whole-buffer
+operations (``bytes.translate``, big-integer AND, ``bytes.count``), so
+scanning millions of rows never runs Python code per task.
+"""
+
+from array import array
+from itertools import compress, repeat
+from operator import and_, ge, le
+from typing import Dict, Iterable, List, Optional
+
+
+# translate() tables: flip 0/1 flags, or widen 1 to 0xFF
+_INVERT = bytes([1, 0]) + bytes(254)
+_SPREAD = bytes([0, 255]) + bytes(254)
+
+
+def _mask_and(first: bytes, second: bytes) -> bytes:
+    """Combine two row masks of the same length byte by byte."""
+    combined = int.from_bytes(first, 'little') & int.from_bytes(second, 'little')
+    return combined.to_bytes(len(first), 'little')
+
+
+class StringHeap:
+    """Append-only UTF-8 storage for many strings, addressed by slot number."""
+    
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array('Q')
+        self.lengths = array('L')
+    
+    def append(self, text: str) -> int:
+        """Store a string and return its slot."""
+        encoded = text.encode('utf-8')
+        self.offsets.append(len(self.data))
+        self.lengths.append(len(encoded))
+        self.data += encoded
+        return len(self.offsets) - 1
+    
+    def replace(self, slot: int, text: str):
+        """Point a slot at a new string (the old bytes become garbage)."""
+        encoded = text.encode('utf-8')
+        self.offsets[slot] = len(self.data)
+        self.lengths[slot] = len(encoded)
+        self.data += encoded
+    
+    def get(self, slot: int) -> str:
+        """Read the string in a slot."""
+        start = self.offsets[slot]
+        return self.data[start:start + self.lengths[slot]].decode('utf-8')
+
+
+class CodeColumn:
+    """
+    A column of small integer codes (priority or category).
+
+    Codes are stored as ``code + 1`` so that 0 can stand for "masked out".
+    Up to 254 distinct codes fit in one byte per row; beyond that the column
+    widens to two bytes per row and uses slower iterator-based scans.
+    """
+    
+    def __init__(self, data=None):
+        self.data = data if data is not None else bytearray()
+        self.codes = set()
+    
+    def __len__(self) -> int:
+        """Number of rows."""
+        return len(self.data)
+    
+    def _widen_for(self, code: int):
+        """Switch to two bytes per row if ``code`` does not fit in one."""
+        self.codes.add(code)
+        if code >= 254 and isinstance(self.data, bytearray):
+            self.data = array('H', iter(self.data))
+    
+    def append(self, code: int):
+        """Add a row."""
+        self._widen_for(code)
+        self.data.append(code + 1)
+    
+    def __setitem__(self, row: int, code: int):
+        """Overwrite the code of a row."""
+        self._widen_for(code)
+        self.data[row] = code + 1
+    
+    def mask(self, codes: Iterable[int]) -> bytes:
+        """Return a 0/1 mask of rows holding any of ``codes``."""
+        if isinstance(self.data, bytearray):
+            table = bytearray(256)
+            for code in codes:
+                if code < 254:
+                    table[code + 1] = 1
+            return self.data.translate(table)
+        wanted = frozenset(code + 1 for code in codes)
+        return bytes(map(wanted.__contains__, self.data))
+    
+    def counts(self, mask: bytes) -> Dict[int, int]:
+        """Count the rows selected by ``mask`` per code."""
+        if isinstance(self.data, bytearray):
+            masked = _mask_and(self.data, mask.translate(_SPREAD))
+            counts = {code: masked.count(code + 1) for code in self.codes}
+        else:
+            counts = {}
+            for value in compress(self.data, mask):
+                counts[value - 1] = counts.get(value - 1, 0) + 1
+        return {code: count for code, count in counts.items() if count}
+    
+    def compacted(self, alive: bytes) -> 'CodeColumn':
+        """Return a copy holding only the rows where ``alive`` is set."""
+        if isinstance(self.data, bytearray):
+            column = CodeColumn(bytearray(compress(self.data, alive)))
+        else:
+            column = CodeColumn(array('H', compress(self.data, alive)))
+        column.codes = set(self.codes)
+        return column
+
+
+class ColumnarTaskStore:
+    """
+    Task fields stored as parallel columns, one row per task.
+
+    Deleted rows are tombstoned (``alive`` is 0) and reclaimed by compact(),
+    which runs automatically once more than half the rows are dead. A due
+    date of 0 means "no due date". Rows are appended in the order tasks are
+    put; select() returns ids in ascending order either way.
+    """
+    
+    def __init__(self):
+        self.ids = array('q')
+        self.alive = bytearray()
+        self.completed = bytearray()
+        self.priority = CodeColumn()
+        self.category = CodeColumn()
+        self.due = array('l')
+        self.descriptions = StringHeap()
+        self._rows: Dict[int, int] = {}
+        self._dead = 0
+        # False once a row was appended after one with a higher id
+        self._in_order = True
+    
+    def __len__(self) -> int:
+        """Number of live rows."""
+        return len(self._rows)
+    
+    def put(self, task_id: int, completed: bool, priority_code: int,
+            category_code: int, due_ordinal: Optional[int], description: str):
+        """Insert a task, or overwrite its row if it is already stored."""
+        due = due_ordinal or 0
+        row = self._rows.get(task_id)
+        if row is None:
+            if self.ids and task_id < self.ids[-1]:
+                self._in_order = False
+            self._rows[task_id] = len(self.ids)
+            self.ids.append(task_id)
+            self.alive.append(1)
+            self.completed.append(1 if completed else 0)
+            self.priority.append(priority_code)
+            self.category.append(category_code)
+            self.due.append(due)
+            self.descriptions.append(description)
+        else:
+            self.completed[row] = 1 if completed else 0
+            self.priority[row] = priority_code
+            self.category[row] = category_code
+            self.due[row] = due
+            if self.descriptions.get(row) != description:
+                self.descriptions.replace(row, description)
+    
+    def remove(self, task_id: int):
+        """Tombstone a task's row."""
+        row = self._rows.pop(task_id, None)
+        if row is None:
+            return
+        self.alive[row] = 0
+        self._dead += 1
+        if self._dead > len(self._rows) and self._dead > 1024:
+            self.compact()
+    
+    def compact(self):
+        """Rebuild the columns without dead rows."""
+        alive = bytes(self.alive)
+        heap = self.descriptions
+        self.ids = array('q', compress(self.ids, alive))
+        self.completed = bytearray(compress(self.completed, alive))
+        self.priority = self.priority.compacted(alive)
+        self.category = self.category.compacted(alive)
+        self.due = array('l', compress(self.due, alive))
+        self.alive = bytearray(b'\x01' * len(self.ids))
+        self.descriptions = StringHeap()
+        for row in compress(range(len(alive)), alive):
+            self.descriptions.append(heap.get(row))
+        self._rows = {task_id: row for row, task_id in enumerate(self.ids)}
+        self._dead = 0
+    
+    def mask(self, completed: Optional[bool] = None,
+             priority_codes: Optional[Iterable[int]] = None,
+             category_codes: Optional[Iterable[int]] = None,
+             due_from: Optional[int] = None,
+             due_to: Optional[int] = None) -> bytes:
+        """Build a 0/1 row mask for the given filters."""
+        mask = bytes(self.alive)
+        if completed is not None:
+            column = self.completed if completed else self.completed.translate(_INVERT)
+            mask = _mask_and(mask, column)
+        if priority_codes is not None:
+            mask = _mask_and(mask, self.priority.mask(priority_codes))
+        if category_codes is not None:
+            mask = _mask_and(mask, self.category.mask(category_codes))
+        if due_from is not None or due_to is not None:
+            # Rows without a due date (0) never match a date range
+            in_range = map(ge, self.due, repeat(max(due_from or 1, 1)))
+            if due_to is not None:
+                in_range = map(and_, in_range, map(le, self.due, repeat(due_to)))
+            mask = _mask_and(mask, bytes(in_range))
+        return mask
+    
+    def select(self, **filters) -> List[int]:
+        """Return the ids of rows matching the filters (see mask()), lowest first."""
+        ids = list(compress(self.ids, self.mask(**filters)))
+        if not self._in_order:
+            ids.sort()
+        return ids
+    
+    def count(self, **filters) -> int:
+        """Count rows matching the filters."""
+        return self.mask(**filters).count(1)
+    
+    def count_by(self, column: str, **filters) -> Dict[int, int]:
+        """Count matching rows per code of ``column`` ('priority' or 'category')."""
+        return getattr(self, column).counts(self.mask(**filters))
@@ -0,0 +1,144 @@
+"""
+Task Indexes
+In-memory index structures that TaskManager keeps up to date as tasks change.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+def trigrams(text: str) -> Set[str]:
+    """Return every three-character substring of ``text``."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Inverted index from three-character substrings to task ids.
+
+    A substring query of three or more characters can only match texts that
+    contain all of its trigrams, so the candidates are found by intersecting
+    posting sets (smallest first) and then confirmed with a plain substring
+    check. Shorter queries fall back to checking every text.
+    """
+    
+    def __init__(self):
+        self._postings: Dict[str, Set[int]] = {}
+        self._texts: Dict[int, str] = {}
+    
+    def __len__(self) -> int:
+        """Number of indexed texts."""
+        return len(self._texts)
+    
+    def add(self, task_id: int, text: str):
+        """Index the text of a task."""
+        text = text.lower()
+        self._texts[task_id] = text
+        for gram in trigrams(text):
+            self._postings.setdefault(gram, set()).add(task_id)
+    
+    def remove(self, task_id: int):
+        """Drop a task from the index."""
+        text = self._texts.pop(task_id, None)
+        if text is None:
+            return
+        for gram in trigrams(text):
+            ids = self._postings[gram]
+            ids.discard(task_id)
+            if not ids:
+                del self._postings[gram]
+    
+    def search(self, query: str, all_terms: bool = False) -> List[int]:
+        """
+        Return the ids whose text contains ``query``, in ascending order.
+
+        With ``all_terms`` the query is split on whitespace and a text must
+        contain every term, in any order.
+        """
+        query = query.lower()
+        terms = query.split() if all_terms else [query]
+        
+        postings = []
+        for term in terms:
+            for gram in trigrams(term):
+                ids = self._postings.get(gram)
+                if not ids:
+                    return []
+                postings.append(ids)
+        
+        if postings:
+            postings.sort(key=len)
+            candidates: Iterable[int] = postings[0].intersection(*postings[1:])
+        else:
+            candidates = self._texts
+        
+        texts = self._texts
+        return sorted(task_id for task_id in candidates
+                      if all(term in texts[task_id] for term in terms))
+
+
+class SortedIndex:
+    """
+    (sort key, task id) pairs kept in sorted order.
+
+    Used for due dates (upcoming and overdue tasks) and for sorted listing.
+    A range of keys is found with binary searches, so reading the first k
+    entries of a range costs O(log n + k) instead of sorting the whole
+    list. Inserting or removing a pair is a binary search plus a list shift
+    done in C.
+    """
+    
+    def __init__(self, entries: Iterable[Tuple[int, int]] = ()):
+        self._entries: List[Tuple[int, int]] = sorted(entries)
+    
+    def __len__(self) -> int:
+        """Number of indexed tasks."""
+        return len(self._entries)
+    
+    def add(self, key: int, task_id: int):
+        """Index a task under ``key``."""
+        insort(self._entries, (key, task_id))
+    
+    def add_many(self, entries: Iterable[Tuple[int, int]]):
+        """Index many pairs at once; the sort merges them with the existing run in O(n)."""
+        self._entries.extend(entries)
+        self._entries.sort()
+    
+    def pop_before(self, end: int) -> List[Tuple[int, int]]:
+        """Remove and return the pairs with keys below ``end``, in order."""
+        entries = self._entries
+        stop = bisect_left(entries, (end,))
+        popped = entries[:stop]
+        del entries[:stop]
+        return popped
+    
+    def remove(self, key: int, task_id: int):
+        """Drop a task from the index."""
+        entries = self._entries
+        position = bisect_left(entries, (key, task_id))
+        if position < len(entries) and entries[position] == (key, task_id):
+            del entries[position]
+    
+    def between(self, start: Optional[int] = None, end: Optional[int] = None) -> Iterator[int]:
+        """Iterate over the ids with keys from ``start`` up to but excluding ``end``, in order."""
+        entries = self._entries
+        position = bisect_left(entries, (start,)) if start is not None else 0
+        stop = bisect_left(entries, (end,)) if end is not None else len(entries)
+        return self._ids(position, stop)
+    
+    def items(self, start: Optional[int] = None,
+              end: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """Like between(), but yield the (key, task id) pairs."""
+        entries = self._entries
+        position = bisect_left(entries, (start,)) if start is not None else 0
+        stop = bisect_left(entries, (end,)) if end is not None else len(entries)
+        return map(entries.__getitem__, range(position, stop))
+    
+    def after(self, entry: Tuple[int, int]) -> Iterator[int]:
+        """Iterate over the ids that come after a (key, task id) pair, in order."""
+        return self._ids(bisect_right(self._entries, entry), len(self._entries))
+    
+    def _ids(self, position: int, stop: int) -> Iterator[int]:
+        """A lazy walk over part of the list that never copies the rest of it."""
+        return map(itemgetter(1), map(self._entries.__getitem__, range(position, stop)))
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Todo List Load Test
+Measures throughput and latency of todo_server.py against running the CLI once per operation.
+
+The server is started on a free port with its own data file. Clients send
+a mix of reads and writes over keep-alive connections, and the same mix is
+then run as one ``todo_app.py --batch -`` process per operation, which is
+what scripts had to do before the server existed.
+
+    python load_test.py
+    python load_test.py --clients 32 --requests 200 --storage sqlite
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from storage import STORAGE_BACKENDS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# (weight, HTTP method, path, body, CLI command); {id} is any existing task id
+WORKLOAD = (
+    (30, 'GET', '/tasks?status=incomplete&limit=20', None, 'list --status incomplete --limit 20'),
+    (20, 'GET', '/tasks/{id}', None, 'list --limit 1'),
+    (15, 'GET', '/search?q=number+{id}', None, 'search "number {id}"'),
+    (5, 'GET', '/stats', None, 'stats'),
+    (20, 'POST', '/tasks', {'description': "Load test task", 'priority': 'High'},
+     'add "Load test task" --priority High'),
+    (10, 'POST', '/tasks/{id}/complete', None, 'complete {id}'),
+)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """The value below which ``fraction`` of the sorted values fall."""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(name: str, latencies: List[float], seconds: float):
+    """Print throughput and latency percentiles in milliseconds."""
+    latencies.sort()
+    print(f"{name:>8s} | {len(latencies) / seconds:10.0f} | "
+          f"{percentile(latencies, 0.5) * 1000:8.2f} | {percentile(latencies, 0.99) * 1000:8.2f}")
+
+
+def pick_operations(count: int, task_count: int, seed: int) -> List[Tuple]:
+    """Choose ``count`` operations from WORKLOAD, with task ids filled in."""
+    rng = random.Random(seed)
+    weights = [entry[0] for entry in WORKLOAD]
+    operations = []
+    for _, method, path, body, cli in rng.choices(WORKLOAD, weights, k=count):
+        task_id = rng.randint(1, task_count)
+        operations.append((method, path.format(id=task_id), body, cli.format(id=task_id)))
+    return operations
+
+
+async def http_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                       method: str, path: str, body: Optional[dict]) -> int:
+    """Send one request on a keep-alive connection and read the response; returns the status."""
+    payload = json.dumps(body).encode('utf-8') if body is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+                 f"Content-Length: {len(payload)}\r\n\r\n".encode('latin-1') + payload)
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return int(lines[0].split(' ')[1])
+
+
+async def run_clients(port: int, clients: List[List[Tuple]]) -> Tuple[List[float], float]:
+    """Run each client's operations on its own connection; returns latencies and total seconds."""
+    latencies = []
+    
+    async def client(operations: List[Tuple]):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        for method, path, body, _ in operations:
+            start = time.perf_counter()
+            status = await http_request(reader, writer, method, path, body)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                raise RuntimeError(f"{method} {path} failed with status {status}")
+        writer.close()
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(client(operations) for operations in clients))
+    return latencies, time.perf_counter() - start
+
+
+def start_server(data_file: str, storage: str) -> Tuple[subprocess.Popen, int]:
+    """Start todo_server.py on a free port; returns the process and the port."""
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, 'todo_server.py'), '--port', '0',
+         '--data-file', data_file, '--storage', storage],
+        stdout=subprocess.PIPE, text=True)
+    line = server.stdout.readline()
+    if not line.startswith("Serving tasks on"):
+        server.kill()
+        raise RuntimeError("todo_server.py did not start")
+    return server, int(line.rstrip().rstrip('/').rsplit(':', 1)[1])
+
+
+def seed_tasks(data_file: str, storage: str, count: int):
+    """Create ``count`` tasks with a single batch run of the CLI."""
+    commands = ''.join(f'add "Task number {i}"\n' for i in range(count))
+    subprocess.run([sys.executable, os.path.join(HERE, 'todo_app.py'), '--data-file', data_file,
+                    '--storage', storage, '--batch', '-'],
+                   input=commands, text=True, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL, check=True)
+
+
+def run_cli(data_file: str, storage: str, clients: List[List[Tuple]]) -> Tuple[List[float], float]:
+    """Run every operation as its own todo_app.py process, one thread per client."""
+    latencies = []
+    
+    def client(operations: List[Tuple]):
+        for _, _, _, cli in operations:
+            start = time.perf_counter()
+            subprocess.run([sys.executable, os.path.join(HERE, 'todo_app.py'),
+                            '--data-file', data_file, '--storage', storage, '--batch', '-'],
+                           input=cli + '\n', text=True, stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL, check=True)
+            latencies.append(time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(len(clients)) as pool:
+        list(pool.map(client, clients))
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    """Run the load test and print a comparison."""
+    parser = argparse.ArgumentParser(description="Load test for todo_server.py")
+    parser.add_argument('--clients', type=int, default=16, help="Concurrent clients")
+    parser.add_argument('--requests', type=int, default=500, help="Requests per client (server)")
+    parser.add_argument('--cli-requests', type=int, default=10,
+                        help="Operations per client for the CLI comparison (0: skip it)")
+    parser.add_argument('--tasks', type=int, default=10_000, help="Tasks created before the test")
+    parser.add_argument('--storage', choices=sorted(STORAGE_BACKENDS), default='journal',
+                        help="Storage backend")
+    parser.add_argument('--seed', type=int, default=1, help="Random seed for the workload")
+    options = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        data_file = os.path.join(directory, 'tasks')
+        seed_tasks(data_file, options.storage, options.tasks)
+        print(f"=== {options.clients} clients, {options.tasks} tasks, {options.storage} storage ===")
+        print(f"{'mode':>8s} | {'requests/s':>10s} | {'p50 ms':>8s} | {'p99 ms':>8s}")
+        
+        server, port = start_server(data_file, options.storage)
+        try:
+            clients = [pick_operations(options.requests, options.tasks, options.seed + number)
+                       for number in range(options.clients)]
+            report('server', *asyncio.run(run_clients(port, clients)))
+        finally:
+            server.terminate()
+            server.wait()
+        
+        if options.cli_requests:
+            clients = [pick_operations(options.cli_requests, options.tasks, options.seed + number)
+                       for number in range(options.clients)]
+            report('cli', *run_cli(data_file, options.storage, clients))
+
+
+if __name__ == "__main__":
+    main()
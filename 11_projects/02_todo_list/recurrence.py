@@ -0,0 +1,227 @@
+"""
+Recurring Tasks
+Recurrence rules and lazy generation of the dates they fall on.
+
+A recurring task stores one rule instead of one task per occurrence. The
+task's due date is its first occurrence (its creation date if it has no
+due date), and later occurrences are computed only for the window that is
+asked for. Rules are written as:
+
+    daily, weekly, monthly, yearly
+    every <n> days|weeks|months|years
+    cron <day of month> <month> <day of week>
+
+The cron form takes the date fields of a crontab line: ``*``, numbers,
+ranges (``1-5``), lists (``1,15``), steps (``*/2``, ``1-31/7``), and day
+names for the day of week (``mon-fri``; 0 and 7 are both Sunday). As in
+cron, when both the day of month and the day of week are restricted a
+date matching either one counts.
+
+Monthly and yearly rules that start on a day some months lack (the 31st,
+or February 29th) fall on the last day of those months instead.
+"""
+
+import calendar
+import re
+from datetime import date
+from functools import lru_cache
+from itertools import count
+from typing import FrozenSet, Iterator, Optional
+
+UNITS = {'day': 1, 'week': 7, 'month': 1, 'year': 12}
+NAMED_RULES = {'daily': (1, 'day'), 'weekly': (1, 'week'),
+               'monthly': (1, 'month'), 'yearly': (1, 'year')}
+WEEKDAYS = ('sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat')
+MONTHS = tuple(name.lower() for name in calendar.month_abbr[1:])
+
+_EVERY = re.compile(r'every\s+(\d+)\s+(day|week|month|year)s?')
+
+
+def _parse_field(text: str, low: int, high: int, names=()) -> Optional[FrozenSet[int]]:
+    """Parse one cron field into the set of values it allows; None for ``*``."""
+    if text == '*':
+        return None
+    
+    def value(part: str) -> int:
+        if part in names:
+            return names.index(part) + low
+        try:
+            number = int(part)
+        except ValueError:
+            raise ValueError(f"Unknown value in recurrence rule: {part}") from None
+        if not low <= number <= high:
+            raise ValueError(f"{number} is out of range {low}-{high}")
+        return number
+    
+    values = set()
+    for item in text.split(','):
+        item, _, step = item.partition('/')
+        if item == '*':
+            first, last = low, high
+        else:
+            first, _, last = item.partition('-')
+            first = value(first)
+            last = value(last) if last else (high if step else first)
+        if last < first:
+            raise ValueError(f"Range {item} runs backwards")
+        try:
+            step = int(step) if step else 1
+        except ValueError:
+            raise ValueError(f"Unknown step in recurrence rule: {step}") from None
+        if step < 1:
+            raise ValueError("A cron step must be at least 1")
+        values.update(range(first, last + 1, step))
+    return frozenset(values)
+
+
+class Recurrence:
+    """A parsed recurrence rule; use parse_recurrence() to get one."""
+    
+    __slots__ = ('text', 'step', 'unit', 'days', 'months', 'weekdays', '_month_days')
+    
+    def __init__(self, text: str):
+        self.text = text
+        rule = ' '.join(text.lower().split())
+        self.days = self.months = self.weekdays = None
+        # Matching days of each (year, month) seen so far, for cron rules
+        self._month_days = {}
+        if rule in NAMED_RULES:
+            self.step, self.unit = NAMED_RULES[rule]
+        elif _EVERY.fullmatch(rule):
+            number, unit = _EVERY.fullmatch(rule).groups()
+            self.step, self.unit = int(number), unit
+            if not self.step:
+                raise ValueError("A recurrence interval must be at least 1")
+        elif rule.startswith('cron '):
+            fields = rule.split()[1:]
+            if len(fields) != 3:
+                raise ValueError("A cron rule needs day of month, month and day of week")
+            self.step, self.unit = 1, 'cron'
+            self.days = _parse_field(fields[0], 1, 31)
+            self.months = _parse_field(fields[1], 1, 12, MONTHS)
+            weekdays = _parse_field(fields[2], 0, 7, WEEKDAYS)
+            # Stored as date.weekday() numbers: Monday is 0, Sunday 6
+            self.weekdays = None if weekdays is None else frozenset(
+                (day - 1) % 7 for day in weekdays)
+            if self.days is not None and self.weekdays is None and not any(
+                    day <= calendar.monthrange(2000, month)[1] for day in self.days
+                    for month in (self.months if self.months is not None else range(1, 13))):
+                raise ValueError(f"'{text}' never matches a date")
+        else:
+            raise ValueError(f"Unknown recurrence rule: {text}")
+    
+    def occurrences(self, first: int, start: Optional[int] = None,
+                    end: Optional[int] = None) -> Iterator[int]:
+        """
+        Yield the day ordinals of the occurrences of a series starting on ``first``.
+
+        Only dates from ``start`` up to but excluding ``end`` are produced;
+        without ``end`` the iterator never stops, so take what you need.
+        """
+        start = first if start is None or start < first else start
+        if self.unit in ('day', 'week'):
+            step = self.step * UNITS[self.unit]
+            # Jump straight to the first occurrence in the window
+            start = first + -(-(start - first) // step) * step
+            return iter(range(start, end, step)) if end is not None else count(start, step)
+        if self.unit == 'cron':
+            return self._cron(start, end)
+        return self._monthly(first, start, end)
+    
+    def next_after(self, first: int, day: int) -> int:
+        """The first occurrence on or after ``day``."""
+        return next(self.occurrences(first, day))
+    
+    def _monthly(self, first: int, start: int, end: Optional[int]) -> Iterator[int]:
+        """Occurrences every ``step`` months (or years) on the day of month of ``first``."""
+        anchor = date.fromordinal(first)
+        step = self.step * UNITS[self.unit]
+        months = anchor.year * 12 + anchor.month - 1
+        # Skip the whole periods that end before the window starts
+        begin = date.fromordinal(start)
+        months += max(0, (begin.year * 12 + begin.month - 1 - months) // step - 1) * step
+        while True:
+            year, month = divmod(months, 12)
+            day = anchor.day
+            if day > 28:
+                day = min(day, calendar.monthrange(year, month + 1)[1])
+            ordinal = date(year, month + 1, day).toordinal()
+            if end is not None and ordinal >= end:
+                return
+            if ordinal >= start:
+                yield ordinal
+            months += step
+    
+    def _cron(self, start: int, end: Optional[int]) -> Iterator[int]:
+        """Occurrences of a cron rule, worked out one month at a time."""
+        begin = date.fromordinal(start)
+        year, month = begin.year, begin.month
+        while True:
+            month_start = date(year, month, 1).toordinal()
+            if end is not None and month_start >= end:
+                return
+            for day in self._days_in(year, month):
+                ordinal = month_start + day - 1
+                if end is not None and ordinal >= end:
+                    return
+                if ordinal >= start:
+                    yield ordinal
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    
+    def _days_in(self, year: int, month: int) -> tuple:
+        """The days of a month that match the cron fields, worked out once per month."""
+        days = self._month_days.get((year, month))
+        if days is None:
+            if self.months is not None and month not in self.months:
+                days = ()
+            else:
+                first_weekday, length = calendar.monthrange(year, month)
+                days = tuple(day for day in range(1, length + 1)
+                             if self._matches_day(day, (first_weekday + day - 1) % 7))
+            self._month_days[(year, month)] = days
+        return days
+    
+    def _matches_day(self, day: int, weekday: int) -> bool:
+        """Whether a day of month and day of week satisfy the cron fields."""
+        if self.days is None:
+            return self.weekdays is None or weekday in self.weekdays
+        if self.weekdays is None:
+            return day in self.days
+        return day in self.days or weekday in self.weekdays
+
+
+@lru_cache(maxsize=4096)
+def parse_recurrence(text: str) -> Recurrence:
+    """Parse a rule, sharing one Recurrence between tasks with the same text.
+
+    Raises ValueError for a rule that cannot be parsed.
+    """
+    return Recurrence(text)
+
+
+class Occurrence:
+    """One dated occurrence of a task: reads like the task, with its own due date."""
+    
+    __slots__ = ('task', 'due_ordinal')
+    
+    def __init__(self, task, due_ordinal: int):
+        self.task = task
+        self.due_ordinal = due_ordinal
+    
+    def __getattr__(self, name: str):
+        return getattr(self.task, name)
+    
+    @property
+    def due_date(self) -> str:
+        """Date of this occurrence as YYYY-MM-DD."""
+        return date.fromordinal(self.due_ordinal).isoformat()
+    
+    def to_dict(self):
+        """The task's dictionary, with this occurrence's due date."""
+        data = self.task.to_dict()
+        data['due_date'] = self.due_date
+        return data
+    
+    def __str__(self) -> str:
+        # Task.__str__ reads everything through attributes, so it shows this due date
+        return type(self.task).__str__(self)
@@ -0,0 +1,132 @@
+"""
+Task Rendering
+Formats lists of tasks for the terminal or for other programs.
+
+Rows are formatted in batches and each batch goes to the output stream in
+one write() call, instead of one print() per task. Column text that
+repeats from row to row (priority with its icon, due date) is formatted
+once and then looked up by the task's priority code or due-date ordinal,
+which skips converting them back to strings for every row.
+
+Output formats:
+
+- table: the aligned table shown by the interactive app
+- plain: tab-separated columns without icons or a header
+- csv: comma-separated values with a header row
+- jsonl: one JSON object per task per line
+"""
+
+import csv
+import io
+import json
+import sys
+from typing import Dict, IO, Iterable, List, Optional
+
+
+PRIORITY_ICONS = {"High": "🔴", "Medium": "🟡", "Low": "🟢"}
+DEFAULT_ICON = "⚪"
+
+OUTPUT_FORMATS = ('table', 'plain', 'csv', 'jsonl')
+
+TABLE_HEADER = f"{'ID':2s} | {'Status':6s} | {'Priority':8s} | {'Due Date':10s} | Description"
+CSV_COLUMNS = ('id', 'description', 'completed', 'priority', 'created_date', 'due_date', 'category',
+               'recurrence')
+
+
+class TaskRenderer:
+    """Writes tasks to a stream in one of OUTPUT_FORMATS, a batch at a time."""
+    
+    def __init__(self, output_format: str = 'table', stream: Optional[IO] = None,
+                 batch_size: int = 1000):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Output format must be one of {', '.join(OUTPUT_FORMATS)}")
+        self.output_format = output_format
+        # None means whatever sys.stdout is when render() is called
+        self.stream = stream
+        self.batch_size = batch_size
+        # Formatted columns keyed by priority code and due-date ordinal
+        self._priorities: Dict[int, str] = {}
+        self._due_dates: Dict[int, str] = {}
+        self._encode = json.JSONEncoder(ensure_ascii=False).encode
+    
+    @property
+    def for_people(self) -> bool:
+        """Whether the format is meant to be read in a terminal (table or plain)."""
+        return self.output_format in ('table', 'plain')
+    
+    def render(self, tasks: Iterable, title: Optional[str] = None) -> int:
+        """Write the tasks, with a header for table and csv; returns the number written.
+        
+        A ``title`` is shown above the table; other formats leave it out.
+        """
+        stream = self.stream or sys.stdout
+        format_rows = getattr(self, f"_{self.output_format}_rows")
+        if self.output_format == 'table':
+            title_line = f"{title}\n" if title else ""
+            stream.write(f"\n{title_line}{TABLE_HEADER}\n{'-' * 80}\n")
+        elif self.output_format == 'csv':
+            stream.write(','.join(CSV_COLUMNS) + '\r\n')
+        
+        count = 0
+        batch = []
+        for task in tasks:
+            batch.append(task)
+            if len(batch) == self.batch_size:
+                stream.write(format_rows(batch))
+                count += len(batch)
+                batch = []
+        if batch:
+            stream.write(format_rows(batch))
+            count += len(batch)
+        stream.flush()
+        return count
+    
+    def _priority_column(self, task) -> str:
+        """Icon and padded priority name, formatted once per priority."""
+        column = self._priorities.get(task.priority_code)
+        if column is None:
+            priority = task.priority
+            icon = PRIORITY_ICONS.get(priority, DEFAULT_ICON)
+            column = self._priorities[task.priority_code] = f"{icon} {priority:6s}"
+        return column
+    
+    def _due_column(self, task) -> str:
+        """Padded due date, formatted once per date."""
+        ordinal = task.due_ordinal
+        if ordinal is None:
+            # No due date, or one that is not an ISO date
+            return f"{task.due_date or 'No due date':10s}"
+        column = self._due_dates.get(ordinal)
+        if column is None:
+            column = self._due_dates[ordinal] = f"{task.due_date:10s}"
+        return column
+    
+    def _table_rows(self, tasks: List) -> str:
+        """Format rows exactly like str(task)."""
+        priority_column = self._priority_column
+        due_column = self._due_column
+        return ''.join([
+            f"{task.id:2d} | {'[x]' if task.completed else '[ ]'} | "
+            f"{priority_column(task)} | {due_column(task)} | {task.description}\n"
+            for task in tasks])
+    
+    def _plain_rows(self, tasks: List) -> str:
+        """Format rows as tab-separated columns."""
+        return ''.join([
+            f"{task.id}\t{'done' if task.completed else 'todo'}\t{task.priority}\t"
+            f"{task.due_date or '-'}\t{task.category}\t{task.description}\n"
+            for task in tasks])
+    
+    def _csv_rows(self, tasks: List) -> str:
+        """Format rows as CSV, quoting where needed."""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(
+            [task.id, task.description, task.completed, task.priority,
+             task.created_date, task.due_date or '', task.category, task.recurrence or '']
+            for task in tasks)
+        return buffer.getvalue()
+    
+    def _jsonl_rows(self, tasks: List) -> str:
+        """Format rows as one JSON object per line."""
+        encode = self._encode
+        return ''.join([encode(task.to_dict()) + '\n' for task in tasks])
@@ -0,0 +1,160 @@
+"""
+Binary Snapshots
+A compact, memory-mappable file format for the todo list.
+
+Layout (all integers little-endian):
+
+    header   magic b'TODO', version, record count, and the offsets of the
+             string pool and id index
+    records  one fixed-width record per task: id, completed flag and a
+             (offset, length) reference into the string pool for each of
+             description, priority, created date, due date, category and
+             recurrence rule (version 1 files have no recurrence)
+    pool     UTF-8 bytes of every distinct string, stored once
+    index    (id, record number) pairs sorted by id, for binary search
+
+Because records have a fixed width, a reader can jump straight to any task
+without parsing the rest of the file. BinarySnapshot opens the file with
+mmap, so tasks are only decoded when asked for, and several processes
+reading the same snapshot share one copy in the operating system's cache.
+"""
+
+import mmap
+import struct
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional
+
+
+MAGIC = b'TODO'
+VERSION = 2
+
+HEADER = struct.Struct('<4sHxxQQQQ')  # magic, version, count, pool offset, pool size, index offset
+RECORD = struct.Struct('<qB3x12I')    # id, completed, 6 x (string offset, length)
+INDEX_ENTRY = struct.Struct('<qQ')    # task id, record number
+
+STRING_FIELDS = ('description', 'priority', 'created_date', 'due_date', 'category', 'recurrence')
+
+# Record layout and string fields of each version that can still be read
+FORMATS = {
+    1: (struct.Struct('<qB3x10I'), STRING_FIELDS[:5]),
+    VERSION: (RECORD, STRING_FIELDS),
+}
+NULL_LENGTH = 0xFFFFFFFF  # length used for a None string
+
+
+def write_snapshot(f: BinaryIO, records: Iterable[Dict]) -> int:
+    """Write task records to a binary file opened for writing; returns the count."""
+    pool = bytearray()
+    pool_refs: Dict[str, tuple] = {}
+    index = []
+    
+    def ref(value: Optional[str]) -> tuple:
+        """Return the pool (offset, length) of a string, adding it if new."""
+        if value is None:
+            return 0, NULL_LENGTH
+        found = pool_refs.get(value)
+        if found is None:
+            encoded = value.encode('utf-8')
+            found = pool_refs[value] = (len(pool), len(encoded))
+            pool.extend(encoded)
+        return found
+    
+    f.write(bytes(HEADER.size))
+    for number, record in enumerate(records):
+        refs = []
+        for field in STRING_FIELDS:
+            refs.extend(ref(record.get(field)))
+        f.write(RECORD.pack(record['id'], 1 if record['completed'] else 0, *refs))
+        index.append((record['id'], number))
+        # Descriptions are rarely repeated; don't keep them all in the lookup table
+        pool_refs.pop(record['description'], None)
+    
+    pool_offset = HEADER.size + len(index) * RECORD.size
+    f.write(pool)
+    index_offset = pool_offset + len(pool)
+    index.sort()
+    f.write(b''.join(INDEX_ENTRY.pack(task_id, number) for task_id, number in index))
+    f.seek(0)
+    f.write(HEADER.pack(MAGIC, VERSION, len(index), pool_offset, len(pool), index_offset))
+    return len(index)
+
+
+class BinarySnapshot:
+    """Read-only, memory-mapped access to a binary snapshot file."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            size = f.seek(0, 2)
+            # mmap cannot map an empty file
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        if len(self._map) < HEADER.size:
+            raise ValueError(f"{path} is not a binary task snapshot")
+        magic, version, count, pool_offset, pool_size, index_offset = \
+            HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version not in FORMATS:
+            raise ValueError(f"{path} is not a binary task snapshot")
+        self._record, self._fields = FORMATS[version]
+        self.count = count
+        self._pool_offset = pool_offset
+        self._index_offset = index_offset
+        # Short repeated strings (priorities, categories, dates) are decoded once
+        self._strings: Dict[tuple, str] = {}
+    
+    def __len__(self) -> int:
+        """Number of tasks in the snapshot."""
+        return self.count
+    
+    def __iter__(self) -> Iterator[Dict]:
+        """Yield every task record in file order."""
+        end = HEADER.size + self.count * self._record.size
+        # Release the views on exit so the map can be closed afterwards
+        with memoryview(self._map) as view, view[HEADER.size:end] as table:
+            for values in self._record.iter_unpack(table):
+                yield self._to_record(values)
+    
+    def record(self, number: int) -> Dict:
+        """Decode the record at position ``number``."""
+        return self._to_record(self._record.unpack_from(
+            self._map, HEADER.size + number * self._record.size))
+    
+    def get(self, task_id: int) -> Optional[Dict]:
+        """Find a task by id with a binary search of the index."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            found_id, number = INDEX_ENTRY.unpack_from(
+                self._map, self._index_offset + middle * INDEX_ENTRY.size)
+            if found_id == task_id:
+                return self.record(number)
+            if found_id < task_id:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+    
+    def _string(self, offset: int, length: int, cache: bool) -> Optional[str]:
+        """Read a string from the pool."""
+        if length == NULL_LENGTH:
+            return None
+        if cache:
+            value = self._strings.get((offset, length))
+            if value is not None:
+                return value
+        start = self._pool_offset + offset
+        value = self._map[start:start + length].decode('utf-8')
+        if cache:
+            self._strings[(offset, length)] = value
+        return value
+    
+    def _to_record(self, values: tuple) -> Dict:
+        """Turn unpacked record values into a task dictionary."""
+        record = {'id': values[0], 'completed': bool(values[1]), 'recurrence': None}
+        for position, field in enumerate(self._fields):
+            offset, length = values[2 + 2 * position], values[3 + 2 * position]
+            record[field] = self._string(offset, length, field != 'description')
+        return record
+    
+    def close(self):
+        """Unmap the file."""
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
@@ -0,0 +1,1186 @@
+"""
+Storage Backends
+Pluggable persistence layers used by the todo list TaskManager.
+
+A backend loads task records (plain dictionaries) and persists the changes
+that TaskManager makes. The following backends are provided:
+
+- JsonFileStorage: the original format, one JSON array rewritten on each change
+- JournalStorage: an append-only operation log plus a periodically compacted
+  JSON snapshot, so a single edit only appends one line to disk
+- BinaryStorage: a fixed-width binary snapshot that is read through mmap
+  (see snapshot.py)
+- SqliteStorage: a SQLite database updated one row per change, which can
+  also answer list, search and statistics queries with indexed SQL
+- ShardedStorage: one JSON file per category plus a manifest, so a change
+  rewrites only its own category's file and tasks can be loaded one
+  category at a time
+- MemoryStorage: keeps nothing on disk (useful for benchmarks and scripts)
+
+File backends never overwrite data in place: snapshots are written to a
+temporary file and renamed over the old one, so a crash leaves either the
+old or the new file. How often data is forced to disk with fsync is set by
+the ``fsync`` policy:
+
+- 'always': fsync every write (safest, slowest)
+- 'batched': fsync at most once per ``fsync_interval`` seconds and on close
+- 'never': leave flushing to the operating system
+
+Several processes may share one data file. Each backend offers lock(), an
+exclusive lock held across processes, and sync(), which reports the task
+records that other processes changed since this one last read or wrote the
+file. TaskManager takes the lock and merges those records before every
+change, so concurrent writers never overwrite each other's updates.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from array import array
+from contextlib import contextmanager, nullcontext
+from operator import attrgetter
+from typing import Callable, ContextManager, Dict, IO, Iterable, Iterator, List, Optional, Set
+
+from locking import FileLock
+from snapshot import BinarySnapshot, write_snapshot
+
+
+FSYNC_POLICIES = ('always', 'batched', 'never')
+
+
+class Change:
+    """A single mutation made by TaskManager (add, update or delete).
+    
+    For updates, ``fields`` holds the new values and ``previous`` the values
+    they replaced, so the change can be reverted.
+    """
+    
+    __slots__ = ('op', 'task', 'fields', 'previous')
+    
+    def __init__(self, op: str, task, fields: Optional[Dict] = None,
+                 previous: Optional[Dict] = None):
+        self.op = op
+        self.task = task
+        self.fields = fields
+        self.previous = previous
+    
+    def to_record(self) -> Dict:
+        """Convert the change to a journal record."""
+        if self.op == 'add':
+            return {'op': 'add', 'task': self.task.to_dict()}
+        if self.op == 'update':
+            return {'op': 'update', 'id': self.task.id, 'fields': self.fields}
+        return {'op': 'delete', 'id': self.task.id}
+
+
+class StoredChanges:
+    """
+    Task records changed in storage by other processes.
+
+    ``records`` maps task ids to the changed fields (the whole record for a
+    new task) or to None for a deleted task. When ``complete`` is true the
+    backend could not tell what changed, so ``records`` holds every stored
+    task in full and any task missing from it was deleted. If ``shards`` is
+    set, that only holds for tasks whose category (ignoring case) is one of
+    those shard keys; tasks in other categories were not read at all.
+    """
+    
+    __slots__ = ('records', 'complete', 'shards')
+    
+    def __init__(self, records: Dict[int, Optional[Dict]], complete: bool = False,
+                 shards: Optional[List[str]] = None):
+        self.records = records
+        self.complete = complete
+        self.shards = shards
+
+
+class TaskStorage:
+    """Base class for task storage backends."""
+    
+    # True for backends that implement query_tasks(), search() and statistics()
+    supports_queries = False
+    # True for backends that can load tasks one category shard at a time
+    # (see ShardedStorage)
+    supports_shards = False
+    
+    def load(self) -> Iterable[Dict]:
+        """Return the stored task records (may be a lazy iterator).
+        
+        Raises ValueError if the stored data is corrupt.
+        """
+        raise NotImplementedError
+    
+    def save(self, tasks: Iterable) -> None:
+        """Write a full snapshot of the given tasks."""
+        raise NotImplementedError
+    
+    def commit(self, changes: List[Change], tasks: Iterable) -> None:
+        """Persist a list of changes; ``tasks`` is the full current task set.
+        
+        Backends that support shards get only the tasks of the shards the
+        changes touch (see ShardedStorage.touched_shards()).
+        """
+        self.save(tasks)
+    
+    def lock(self) -> ContextManager:
+        """Return a context manager that excludes writers in other processes."""
+        return nullcontext()
+    
+    def sync(self) -> Optional[StoredChanges]:
+        """Report changes made by other processes since the last load, sync or write.
+        
+        Returns None when nothing changed. Call it while holding lock().
+        """
+        return None
+    
+    def close(self) -> None:
+        """Release any open file handles."""
+
+
+class FileStorage(TaskStorage):
+    """Base class for backends that keep tasks in local files."""
+    
+    def __init__(self, path: str, fsync: str = 'always', fsync_interval: float = 1.0,
+                 compact: bool = False):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {', '.join(FSYNC_POLICIES)}")
+        self.path = path
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        # Compact JSON drops indentation and spaces after separators
+        self.json_options = {'separators': (',', ':')} if compact else {'indent': 2}
+        self._last_fsync = time.monotonic()
+        self._unsynced = False
+        self._lock = FileLock(path + '.lock')
+        # Signature and content digest of the data file as this process last read or wrote it
+        self._seen = None
+        self._seen_digest = None
+    
+    def lock(self) -> FileLock:
+        """The inter-process lock on ``<path>.lock``."""
+        return self._lock
+    
+    def sync(self) -> Optional[StoredChanges]:
+        """Re-read the file if another process changed it.
+        
+        A snapshot file is rewritten as a whole, so every record is returned
+        and the caller works out which ones differ.
+        """
+        return None if self._unchanged() else self._reload()
+    
+    def _remember(self):
+        """Record the data file's current signature and digest as seen."""
+        self._seen = _file_signature(self.path)
+        self._seen_digest = _file_digest(self.path)
+    
+    def _unchanged(self) -> bool:
+        """Whether the data file still holds what this process last saw.
+        
+        A stat() call settles the common case. Only when the signature
+        differs is the file hashed, so a file that was touched or rewritten
+        with the same content is not parsed again.
+        """
+        signature = _file_signature(self.path)
+        if signature == self._seen:
+            return True
+        if _file_digest(self.path) == self._seen_digest:
+            self._seen = signature
+            return True
+        return False
+    
+    def _reload(self) -> StoredChanges:
+        """Read every stored record, for a caller to compare with its own."""
+        return StoredChanges({record['id']: record for record in self.load()}, complete=True)
+    
+    def _sync_due(self) -> bool:
+        """Decide whether the write just made should be fsynced now."""
+        if self.fsync == 'always':
+            return True
+        if self.fsync == 'batched':
+            self._unsynced = True
+            return time.monotonic() - self._last_fsync >= self.fsync_interval
+        return False
+    
+    def _synced(self):
+        """Note that everything written so far is on disk."""
+        self._last_fsync = time.monotonic()
+        self._unsynced = False
+    
+    def _write_atomic(self, path: str, write: Callable[[IO], None], force_sync: bool = False,
+                      binary: bool = False):
+        """Write a file through a temporary file and an atomic rename."""
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'wb' if binary else 'w') as f:
+                write(f)
+                f.flush()
+                sync = self._sync_due() or force_sync
+                if sync:
+                    os.fsync(f.fileno())
+            os.replace(temp_path, path)
+            if path == self.path:
+                self._remember()
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        if sync:
+            _fsync_directory(directory)
+            self._synced()
+    
+    def _write_snapshot(self, path: str, tasks: Iterable, force_sync: bool = False):
+        """Atomically write all tasks as a JSON array."""
+        records = [task.to_dict() for task in tasks]
+        self._write_atomic(path, lambda f: json.dump(records, f, **self.json_options),
+                           force_sync)
+    
+    def close(self) -> None:
+        """Force any batched writes to disk and release the lock file."""
+        if self._unsynced and os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                os.fsync(f.fileno())
+            _fsync_directory(os.path.dirname(self.path) or '.')
+            self._synced()
+        self._lock.close()
+
+
+def _file_signature(path: str) -> Optional[tuple]:
+    """Identify a version of a file by inode, size and modification time.
+    
+    Files are replaced by rename, so every write gives a new inode even when
+    the clock is too coarse to change the modification time.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def _file_digest(path: str) -> Optional[bytes]:
+    """Hash a file's contents; hashing is much cheaper than parsing it."""
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.digest()
+
+
+def _fsync_directory(directory: str):
+    """Make a rename inside ``directory`` durable (not possible on Windows)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r'\s*')
+_NUMBER_CHARACTERS = '0123456789.eE+-'
+
+
+def iter_json_array(f: IO, chunk_size: int = 1 << 16) -> Iterator:
+    """
+    Yield the elements of a JSON array one at a time from a text file.
+    
+    Only one chunk of the file plus the element being parsed is held in
+    memory, instead of the whole document. Raises json.JSONDecodeError if
+    the file is not a JSON array, including when anything but whitespace
+    follows it (json.load() would reject that as well).
+    """
+    buffer = f.read(chunk_size)
+    pos = 0
+    eof = not buffer
+    
+    def skip():
+        """Advance past whitespace, reading more of the file as needed."""
+        nonlocal buffer, pos, eof
+        while True:
+            pos = _whitespace.match(buffer, pos).end()
+            if pos < len(buffer) or eof:
+                return
+            buffer, pos = f.read(chunk_size), 0
+            eof = not buffer
+    
+    skip()
+    if buffer[pos:pos + 1] != '[':
+        raise json.JSONDecodeError("Expected a JSON array", buffer, pos)
+    pos += 1
+    
+    while True:
+        skip()
+        if buffer[pos:pos + 1] == ']':
+            pos += 1
+            skip()
+            if pos < len(buffer):
+                raise json.JSONDecodeError("Extra data", buffer, pos)
+            return
+        while True:
+            try:
+                value, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                end = None
+            # A value that runs to the end of the buffer may continue in the next chunk,
+            # and so may a number followed only by what could be more of it ("1." or "2e")
+            if end is not None and (eof or (end < len(buffer)
+                                            and buffer[end] not in _NUMBER_CHARACTERS)):
+                break
+            if eof:
+                raise json.JSONDecodeError("Unterminated JSON array", buffer, pos)
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+        yield value
+        pos = end
+        skip()
+        separator = buffer[pos:pos + 1]
+        if separator == ',':
+            pos += 1
+            skip()
+            if buffer[pos:pos + 1] == ']':
+                raise json.JSONDecodeError("Trailing comma", buffer, pos)
+        elif separator != ']':
+            raise json.JSONDecodeError("Expected ',' or ']'", buffer, pos)
+
+
+def iter_snapshot(path: str) -> Iterator[Dict]:
+    """Stream the task records of a JSON snapshot; a missing file has none."""
+    try:
+        f = open(path, 'r')
+    except FileNotFoundError:
+        return
+    with f:
+        yield from iter_json_array(f)
+
+
+class JsonFileStorage(FileStorage):
+    """Stores all tasks in a single JSON array that is rewritten on save."""
+    
+    def __init__(self, path: str = "data/tasks.json", **options):
+        super().__init__(path, **options)
+    
+    def load(self) -> Iterator[Dict]:
+        """Stream task records from the JSON file."""
+        self._remember()
+        return iter_snapshot(self.path)
+    
+    def save(self, tasks: Iterable) -> None:
+        """Rewrite the JSON file with every task."""
+        self._write_snapshot(self.path, tasks)
+
+
+class JournalStorage(FileStorage):
+    """
+    Stores tasks as a JSON snapshot plus an append-only journal.
+
+    Each change is appended to ``<path>.journal`` as one JSON line. Loading
+    reads the snapshot and replays the journal on top of it. Once the journal
+    holds ``compact_every`` records it is folded into a new snapshot and
+    truncated. Replaying a record twice has no extra effect, so a crash during
+    compaction never loses or duplicates tasks. A line left half-written by a
+    crash is cut off on the next load.
+
+    Other processes' changes are picked up by reading only the journal lines
+    appended since this process last read or wrote it; the whole snapshot is
+    re-read only after another process has compacted the journal.
+    """
+    
+    def __init__(self, path: str = "data/tasks.json", compact_every: int = 1000,
+                 **options):
+        options.setdefault('compact', True)
+        super().__init__(path, **options)
+        self.journal_path = path + '.journal'
+        self.compact_every = compact_every
+        self.journal_size = 0
+        self._journal = None
+        # Bytes of the journal already applied by this process
+        self._journal_offset = 0
+    
+    def load(self) -> List[Dict]:
+        """Load the snapshot and replay the journal tail."""
+        self._remember()
+        try:
+            records = {record['id']: record for record in iter_snapshot(self.path)}
+        except ValueError:
+            records = {}
+        self.journal_size = 0
+        self._journal_offset = 0
+        for entry in self._read_journal(truncate=True):
+            self._replay(records, entry)
+        return list(records.values())
+    
+    def _read_journal(self, truncate: bool = False) -> Iterator[Dict]:
+        """Yield the journal entries after ``_journal_offset``, advancing it.
+        
+        Reading stops at a torn final line, which is cut off if ``truncate``.
+        """
+        try:
+            f = open(self.journal_path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(self._journal_offset)
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    entry = None
+                if entry is None or not line.endswith(b'\n'):
+                    # A torn final line from an interrupted append
+                    if truncate:
+                        os.truncate(self.journal_path, self._journal_offset)
+                    return
+                self.journal_size += 1
+                self._journal_offset += len(line)
+                yield entry
+    
+    def sync(self) -> Optional[StoredChanges]:
+        """Read the journal lines other processes appended since the last read or write."""
+        if not self._unchanged():
+            # Another process compacted the journal into a new snapshot
+            return self._reload()
+        try:
+            size = os.path.getsize(self.journal_path)
+        except FileNotFoundError:
+            size = 0
+        if size == self._journal_offset:
+            return None
+        if size < self._journal_offset:
+            return self._reload()
+        changed: Dict[int, Optional[Dict]] = {}
+        for entry in self._read_journal(truncate=True):
+            if entry['op'] == 'add':
+                changed[entry['task']['id']] = dict(entry['task'])
+            elif entry['op'] == 'update':
+                if changed.get(entry['id'], {}) is not None:
+                    changed.setdefault(entry['id'], {}).update(entry['fields'])
+            elif entry['op'] == 'delete':
+                changed[entry['id']] = None
+        return StoredChanges(changed) if changed else None
+    
+    @staticmethod
+    def _replay(records: Dict[int, Dict], entry: Dict):
+        """Apply one journal entry to a dictionary of records keyed by id."""
+        op = entry['op']
+        if op == 'add':
+            task = entry['task']
+            records[task['id']] = task
+        elif op == 'update':
+            record = records.get(entry['id'])
+            if record is not None:
+                record.update(entry['fields'])
+        elif op == 'delete':
+            records.pop(entry['id'], None)
+    
+    def commit(self, changes: List[Change], tasks: Iterable) -> None:
+        """Append the changes to the journal, compacting when it grows large."""
+        if self._journal is None:
+            os.makedirs(os.path.dirname(self.journal_path) or '.', exist_ok=True)
+            self._journal = open(self.journal_path, 'ab')
+        self._journal.write(''.join(json.dumps(change.to_record(), separators=(',', ':')) + '\n'
+                                    for change in changes).encode('utf-8'))
+        self._journal.flush()
+        self._journal_offset = self._journal.tell()
+        if self._sync_due():
+            os.fsync(self._journal.fileno())
+            self._synced()
+        self.journal_size += len(changes)
+        if self.journal_size >= self.compact_every:
+            self.save(tasks)
+    
+    def save(self, tasks: Iterable) -> None:
+        """Write a fresh snapshot and truncate the journal."""
+        self._close_journal()
+        # The snapshot must be durable before the journal it replaces is emptied
+        self._write_snapshot(self.path, tasks, force_sync=self.fsync != 'never')
+        open(self.journal_path, 'w').close()
+        self.journal_size = 0
+        self._journal_offset = 0
+    
+    def _close_journal(self):
+        """Flush batched writes and close the journal file."""
+        if self._journal is not None:
+            if self._unsynced:
+                os.fsync(self._journal.fileno())
+                self._synced()
+            self._journal.close()
+            self._journal = None
+    
+    def close(self) -> None:
+        """Flush batched writes, close the journal and release the lock file."""
+        self._close_journal()
+        self._lock.close()
+
+
+class BinaryStorage(FileStorage):
+    """Stores tasks in the binary snapshot format, rewritten on each change.
+    
+    Records have a fixed width and are decoded straight from a memory map,
+    which makes loading much cheaper than parsing JSON. Use
+    open_snapshot() for read-only access that decodes tasks on demand.
+    """
+    
+    def __init__(self, path: str = "data/tasks.bin", **options):
+        super().__init__(path, **options)
+    
+    def open_snapshot(self) -> BinarySnapshot:
+        """Open the snapshot for random access; close it when done."""
+        return BinarySnapshot(self.path)
+    
+    def load(self) -> Iterator[Dict]:
+        """Stream task records out of the memory-mapped snapshot."""
+        self._remember()
+        try:
+            snapshot = self.open_snapshot()
+        except FileNotFoundError:
+            return
+        try:
+            yield from snapshot
+        finally:
+            snapshot.close()
+    
+    def save(self, tasks: Iterable) -> None:
+        """Rewrite the snapshot with every task."""
+        records = (task.to_dict() for task in tasks)
+        self._write_atomic(self.path, lambda f: write_snapshot(f, records), binary=True)
+
+
+class SqliteStorage(TaskStorage):
+    """
+    Stores tasks in a SQLite database, one row per task.
+
+    Each change becomes a single-row INSERT, UPDATE or DELETE, and a commit
+    runs as one SQLite transaction, so nothing is rewritten wholesale. The
+    database uses write-ahead logging, which lets several processes read it
+    while one writes. Priority, status and category are indexed and counted
+    in a ``task_counts`` table maintained by triggers, and
+    descriptions are indexed with an FTS5 trigram table (when the SQLite
+    build has FTS5) so substring searches do not scan every row.
+
+    The fsync policy maps to SQLite's ``synchronous`` setting: 'always' is
+    FULL, 'batched' is NORMAL (commits stay atomic but the last few may be
+    lost on power failure) and 'never' is OFF.
+
+    Every change also appends the task id to ``task_log``. sync() compares
+    the newest log sequence number with the one this process last saw and
+    re-reads only the rows logged since then.
+    """
+    
+    supports_queries = True
+    
+    COLUMNS = ('id', 'description', 'completed', 'priority', 'created_date',
+               'due_date', 'category', 'recurrence')
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            completed INTEGER NOT NULL DEFAULT 0,
+            priority TEXT NOT NULL,
+            created_date TEXT,
+            due_date TEXT,
+            category TEXT NOT NULL,
+            recurrence TEXT
+        );
+        CREATE INDEX IF NOT EXISTS tasks_priority ON tasks (priority COLLATE NOCASE);
+        CREATE INDEX IF NOT EXISTS tasks_completed ON tasks (completed);
+        CREATE INDEX IF NOT EXISTS tasks_category ON tasks (category COLLATE NOCASE);
+        
+        -- Running totals per priority and category, kept by triggers so that
+        -- statistics() reads a handful of rows instead of scanning every task
+        CREATE TABLE IF NOT EXISTS task_counts (
+            field TEXT NOT NULL,
+            value TEXT NOT NULL,
+            total INTEGER NOT NULL,
+            completed INTEGER NOT NULL,
+            PRIMARY KEY (field, value)
+        ) WITHOUT ROWID;
+        CREATE TRIGGER IF NOT EXISTS task_counts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO task_counts VALUES ('priority', new.priority, 1, new.completed)
+                ON CONFLICT DO UPDATE SET total = total + 1, completed = completed + new.completed;
+            INSERT INTO task_counts VALUES ('category', new.category, 1, new.completed)
+                ON CONFLICT DO UPDATE SET total = total + 1, completed = completed + new.completed;
+        END;
+        CREATE TRIGGER IF NOT EXISTS task_counts_delete AFTER DELETE ON tasks BEGIN
+            UPDATE task_counts SET total = total - 1, completed = completed - old.completed
+                WHERE (field = 'priority' AND value = old.priority)
+                   OR (field = 'category' AND value = old.category);
+            DELETE FROM task_counts WHERE total = 0;
+        END;
+        CREATE TRIGGER IF NOT EXISTS task_counts_update
+        AFTER UPDATE OF priority, category, completed ON tasks BEGIN
+            UPDATE task_counts SET total = total - 1, completed = completed - old.completed
+                WHERE (field = 'priority' AND value = old.priority)
+                   OR (field = 'category' AND value = old.category);
+            INSERT INTO task_counts VALUES ('priority', new.priority, 1, new.completed)
+                ON CONFLICT DO UPDATE SET total = total + 1, completed = completed + new.completed;
+            INSERT INTO task_counts VALUES ('category', new.category, 1, new.completed)
+                ON CONFLICT DO UPDATE SET total = total + 1, completed = completed + new.completed;
+            DELETE FROM task_counts WHERE total = 0;
+        END;
+        
+        -- Ids of changed tasks in commit order, so other processes can fetch
+        -- just those rows; trimmed to the last LOG_LIMIT entries
+        CREATE TABLE IF NOT EXISTS task_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER NOT NULL
+        );
+        CREATE TRIGGER IF NOT EXISTS task_log_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO task_log (task_id) VALUES (new.id);
+        END;
+        CREATE TRIGGER IF NOT EXISTS task_log_update AFTER UPDATE ON tasks BEGIN
+            INSERT INTO task_log (task_id) VALUES (new.id);
+        END;
+        CREATE TRIGGER IF NOT EXISTS task_log_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO task_log (task_id) VALUES (old.id);
+        END;
+    """
+    
+    # External-content FTS table kept in step with the tasks table by triggers
+    FTS_SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+            description, content='tasks', content_rowid='id', tokenize='trigram');
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts (rowid, description) VALUES (new.id, new.description);
+        END;
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, description)
+                VALUES ('delete', old.id, old.description);
+        END;
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF description ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, description)
+                VALUES ('delete', old.id, old.description);
+            INSERT INTO tasks_fts (rowid, description) VALUES (new.id, new.description);
+        END;
+    """
+    
+    SYNCHRONOUS = {'always': 'FULL', 'batched': 'NORMAL', 'never': 'OFF'}
+    
+    LOG_LIMIT = 10_000
+    
+    def __init__(self, path: str = "data/tasks.db", fsync: str = 'always',
+                 timeout: float = 30.0, **options):
+        # JSON options such as compact do not apply and are ignored
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {', '.join(FSYNC_POLICIES)}")
+        self.path = path
+        self.fsync = fsync
+        self.timeout = timeout
+        self.full_text = False
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = FileLock(path + '.lock') if path != ':memory:' else None
+        # Newest task_log sequence number this process has seen
+        self._seen = 0
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use and create the schema if needed."""
+        if self._connection is None:
+            if self.path != ':memory:':
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            # Autocommit mode: transactions are started explicitly in _write()
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            try:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute(f"PRAGMA synchronous={self.SYNCHRONOUS[self.fsync]}")
+                connection.executescript(self.SCHEMA)
+                self._migrate(connection)
+                try:
+                    connection.executescript(self.FTS_SCHEMA)
+                    self.full_text = True
+                except sqlite3.OperationalError:
+                    # SQLite built without FTS5 or the trigram tokenizer
+                    self.full_text = False
+            except sqlite3.DatabaseError as e:
+                connection.close()
+                raise ValueError(f"{self.path} is not a task database: {e}") from e
+            self._connection = connection
+        return self._connection
+    
+    @staticmethod
+    def _migrate(connection: sqlite3.Connection):
+        """Add the columns that databases made by older versions lack."""
+        connection.execute("BEGIN IMMEDIATE")
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(tasks)")}
+        if 'recurrence' not in columns:
+            connection.execute("ALTER TABLE tasks ADD COLUMN recurrence TEXT")
+        connection.execute("COMMIT")
+    
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Run statements in one write transaction, rolled back on error."""
+        connection = self._connect()
+        # IMMEDIATE takes the write lock up front instead of failing halfway
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+    
+    def _log_position(self) -> int:
+        """The sequence number of the newest task_log entry ever written."""
+        row = self._connect().execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'task_log'").fetchone()
+        return row[0] if row else 0
+    
+    def lock(self) -> ContextManager:
+        """The inter-process lock on ``<path>.lock``."""
+        return self._lock if self._lock is not None else nullcontext()
+    
+    def sync(self) -> Optional[StoredChanges]:
+        """Fetch the rows changed by other processes since the last read or write."""
+        position = self._log_position()
+        if position == self._seen:
+            return None
+        connection = self._connect()
+        oldest = connection.execute("SELECT MIN(seq) FROM task_log").fetchone()[0]
+        if oldest is None or oldest > self._seen + 1:
+            # The entries we need were trimmed away
+            return StoredChanges({record['id']: record for record in self.load()}, complete=True)
+        ids = [task_id for task_id, in connection.execute(
+            "SELECT DISTINCT task_id FROM task_log WHERE seq > ?", (self._seen,))]
+        changed: Dict[int, Optional[Dict]] = dict.fromkeys(ids)
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            changed.update((record['id'], record) for record in self._select(
+                f"SELECT {{columns}} FROM tasks WHERE id IN ({', '.join('?' * len(batch))})", batch))
+        self._seen = position
+        return StoredChanges(changed)
+    
+    def _select(self, sql: str, parameters: Iterable = ()) -> Iterator[Dict]:
+        """Run a query over the tasks table and yield task records."""
+        columns = ', '.join(f"tasks.{column}" for column in self.COLUMNS)
+        for row in self._connect().execute(sql.format(columns=columns), tuple(parameters)):
+            record = dict(zip(self.COLUMNS, row))
+            record['completed'] = bool(record['completed'])
+            yield record
+    
+    def load(self) -> Iterator[Dict]:
+        """Stream every task record in id order."""
+        self._seen = self._log_position()
+        return self._select("SELECT {columns} FROM tasks ORDER BY id")
+    
+    def _insert(self, connection: sqlite3.Connection, records: Iterable[Dict]):
+        """Insert task records."""
+        connection.executemany(
+            f"INSERT INTO tasks ({', '.join(self.COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(self.COLUMNS))})",
+            ([record.get(column) for column in self.COLUMNS] for record in records))
+    
+    def save(self, tasks: Iterable) -> None:
+        """Replace the contents of the database with the given tasks."""
+        with self._write() as connection:
+            connection.execute("DELETE FROM tasks")
+            connection.execute("DELETE FROM task_counts")
+            self._insert(connection, (task.to_dict() for task in tasks))
+            # Other processes must re-read everything after a full rewrite
+            connection.execute("DELETE FROM task_log")
+            self._seen = self._log_position()
+    
+    def commit(self, changes: List[Change], tasks: Iterable) -> None:
+        """Apply each change as a single-row statement, all in one transaction."""
+        with self._write() as connection:
+            for change in changes:
+                if change.op == 'add':
+                    self._insert(connection, [change.task.to_dict()])
+                elif change.op == 'update':
+                    # Field names come from TaskManager.UPDATABLE_FIELDS, never from input
+                    assignments = ', '.join(f"{name} = ?" for name in change.fields)
+                    connection.execute(f"UPDATE tasks SET {assignments} WHERE id = ?",
+                                       (*change.fields.values(), change.task.id))
+                else:
+                    connection.execute("DELETE FROM tasks WHERE id = ?", (change.task.id,))
+            self._seen = self._log_position()
+            connection.execute("DELETE FROM task_log WHERE seq <= ?", (self._seen - self.LOG_LIMIT,))
+    
+    def query_tasks(self, priority: Optional[str] = None, completed: Optional[bool] = None,
+                    category: Optional[str] = None) -> Iterator[Dict]:
+        """Yield the records matching the filters (case-insensitive), in id order."""
+        conditions, parameters = [], []
+        if priority is not None:
+            conditions.append("priority = ? COLLATE NOCASE")
+            parameters.append(priority)
+        if completed is not None:
+            conditions.append("completed = ?")
+            parameters.append(int(completed))
+        if category is not None:
+            conditions.append("category = ? COLLATE NOCASE")
+            parameters.append(category)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._select(f"SELECT {{columns}} FROM tasks{where} ORDER BY id", parameters)
+    
+    def search(self, query: str, all_terms: bool = False) -> Iterator[Dict]:
+        """
+        Yield the records whose description contains ``query``, in id order.
+
+        Terms of three or more characters are looked up in the trigram index;
+        shorter terms (and every term without FTS5) use a LIKE scan.
+        """
+        terms = query.split() if all_terms else [query]
+        phrases, conditions, parameters = [], [], []
+        for term in terms:
+            if self.full_text and len(term) >= 3:
+                phrases.append('"' + term.replace('"', '""') + '"')
+            else:
+                escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                conditions.append("tasks.description LIKE ? ESCAPE '\\'")
+                parameters.append(f"%{escaped}%")
+        if phrases:
+            conditions.insert(0, "tasks.id IN (SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH ?)")
+            parameters.insert(0, ' AND '.join(phrases))
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._select(f"SELECT {{columns}} FROM tasks{where} ORDER BY id", parameters)
+    
+    def statistics(self) -> Dict:
+        """Count tasks in total, by status, priority and category (from task_counts)."""
+        priorities, categories, categories_completed = {}, {}, {}
+        total = completed = 0
+        for field, value, count, done in self._connect().execute(
+                "SELECT field, value, total, completed FROM task_counts"):
+            if field == 'priority':
+                priorities[value] = count
+                total += count
+                completed += done
+            else:
+                categories[value] = count
+                if done:
+                    categories_completed[value] = done
+        return {
+            'total': total,
+            'completed': completed,
+            'priorities': priorities,
+            'categories': categories,
+            'categories_completed': categories_completed
+        }
+    
+    def close(self) -> None:
+        """Close the database connection and release the lock file."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+        if self._lock is not None:
+            self._lock.close()
+
+
+class ShardedStorage(FileStorage):
+    """
+    Stores tasks in one JSON file per category, listed in a small manifest.
+
+    Categories are compared ignoring case, as the --category filter does,
+    so "Work" and "work" share a shard. The manifest at ``path`` lists the
+    shards and the next free id. Next to each shard's JSON file, an id file
+    (``shard-N.ids``, sorted little-endian int64) lists the ids it holds, so
+    TaskManager can read just the shards a command needs: the one a category
+    filter names, or the one holding the task being edited. A commit
+    rewrites only the shards its changes touched, their id files when tasks
+    came, went or moved, and the small manifest, so its cost follows the
+    size of those shards rather than of the whole store.
+
+    A shard is only written while the tasks it holds are loaded, since it
+    is rewritten from them. Other processes' writes are found by comparing
+    the file signatures of the loaded shards and of the id files, so
+    unchanged ones are never re-read. The manifest is written before the
+    shards, so a crash between the two can lose the last commit's changes
+    to a shard but never hands out the same id twice.
+    """
+    
+    supports_shards = True
+    
+    VERSION = 2
+    
+    # Shard numbers are kept in two bytes per task id in memory
+    MAX_SHARDS = 0xFFFF
+    
+    def __init__(self, path: str = "data/shards/manifest.json", **options):
+        super().__init__(path, **options)
+        self.directory = os.path.dirname(path) or '.'
+        self.next_id = 1
+        # Shard key -> {'file': file name, 'number': shard number, 'count': tasks}
+        self._shards: Dict[str, Dict] = {}
+        self._keys: Dict[int, str] = {}
+        # Number of the shard holding each task id, indexed by id (0: no such task)
+        self._locations = array('H')
+        # Sorted ids of each shard, and the signature of its id file as last read or written
+        self._ids: Dict[str, array] = {}
+        self._ids_seen: Dict[str, Optional[tuple]] = {}
+        # Signature of each loaded shard's file as last read or written
+        self._loaded: Dict[str, Optional[tuple]] = {}
+        self._loaded_all = False
+    
+    @staticmethod
+    def shard_key(category: str) -> str:
+        """The shard a category's tasks are stored in."""
+        return category.casefold()
+    
+    def load_manifest(self):
+        """Read the manifest and forget which shards were loaded."""
+        self._read_manifest()
+        self._loaded = {}
+        self._loaded_all = False
+    
+    def load(self) -> Iterator[Dict]:
+        """Stream the task records of every shard."""
+        self.load_manifest()
+        return self.load_shards()
+    
+    def needs_loading(self, categories: Optional[Iterable[str]] = None) -> bool:
+        """Whether any shard of these categories (of all, if None) has not been loaded yet."""
+        if categories is None:
+            return not self._loaded_all
+        return not self._loaded_all and any(
+            self.shard_key(category) not in self._loaded for category in categories)
+    
+    def load_shards(self, categories: Optional[Iterable[str]] = None) -> Iterator[Dict]:
+        """Stream the records of the shards of these categories (of all, if None) not loaded yet."""
+        if categories is None:
+            keys = list(self._shards)
+            self._loaded_all = True
+        else:
+            keys = {self.shard_key(category) for category in categories}
+        for key in keys:
+            if key not in self._loaded:
+                yield from self._read_shard(key)
+    
+    def shard_of(self, task_id: int) -> Optional[str]:
+        """The key of the shard holding a task, or None if the manifest has no such task."""
+        number = self._locations[task_id] if 0 < task_id < len(self._locations) else 0
+        return self._keys.get(number)
+    
+    def sync(self) -> Optional[StoredChanges]:
+        """Re-read the loaded shards whose files another process replaced."""
+        if not self._unchanged():
+            self._read_manifest()
+            if self._loaded_all:
+                # Shards created since are new to this process, but it holds every task
+                for key in self._shards:
+                    self._loaded.setdefault(key, None)
+        else:
+            self._read_ids()
+        changed = [key for key, seen in self._loaded.items()
+                   if _file_signature(self._shard_path(key)) != seen]
+        if not changed:
+            return None
+        records = {record['id']: record for key in changed for record in self._read_shard(key)}
+        return StoredChanges(records, complete=True, shards=changed)
+    
+    def touched_shards(self, changes: List[Change]) -> Set[str]:
+        """Keys of the shards a commit of these changes rewrites."""
+        keys = set()
+        for change in changes:
+            keys.add(self.shard_key(change.task.category))
+            if change.op == 'update' and 'category' in change.fields:
+                keys.add(self.shard_key(change.fields['category']))
+                keys.add(self.shard_key(change.previous['category']))
+        return keys
+    
+    def commit(self, changes: List[Change], tasks: Iterable) -> None:
+        """Rewrite the shards the changes touched, and the manifest if tasks came, went or moved.
+        
+        ``tasks`` need only hold the tasks of touched_shards(changes).
+        """
+        moved = [change.task.id for change in changes
+                 if change.op != 'update' or 'category' in change.fields]
+        self._write_shards(self.touched_shards(changes), tasks, moved)
+    
+    def save(self, tasks: Iterable) -> None:
+        """Rewrite every shard and the manifest; ``tasks`` must be every task."""
+        tasks = list(tasks)
+        keys = set(self._shards).union(self.shard_key(task.category) for task in tasks)
+        self._write_shards(keys, tasks, [task.id for task in tasks], rebuild=True)
+    
+    def _write_shards(self, keys: Iterable[str], tasks: Iterable, moved: List[int],
+                      rebuild: bool = False):
+        """Rewrite the given shards from ``tasks``, updating the manifest for the ids in ``moved``.
+        
+        With ``rebuild`` the id locations are worked out afresh from ``tasks``.
+        """
+        shards = {key: [] for key in keys}
+        missing = [key for key in shards if key in self._shards and key not in self._loaded]
+        if missing and not self._loaded_all:
+            raise RuntimeError(f"Shard {missing[0]!r} must be loaded before it is written")
+        if rebuild:
+            self._locations = array('H')
+            self._ids = {}
+        for task in tasks:
+            shard = shards.get(self.shard_key(task.category))
+            if shard is not None:
+                shard.append(task)
+        
+        new_shards = [key for key in shards if key not in self._shards]
+        if moved or new_shards or rebuild:
+            first = max(self._keys, default=0) + 1
+            if new_shards and first + len(new_shards) - 1 > self.MAX_SHARDS:
+                raise ValueError(f"A sharded store holds at most {self.MAX_SHARDS} categories")
+            for number, key in enumerate(new_shards, first):
+                self._shards[key] = {'file': f"shard-{number}.json", 'number': number}
+                self._keys[number] = key
+            self.next_id = max(self.next_id, max(moved, default=0) + 1)
+            for key, shard in shards.items():
+                self._shards[key]['count'] = len(shard)
+            self._write_manifest()
+        
+        for key, shard in shards.items():
+            shard.sort(key=attrgetter('id'))
+            path = self._shard_path(key)
+            self._write_snapshot(path, shard)
+            self._loaded[key] = _file_signature(path)
+            ids = array('q', [task.id for task in shard])
+            if ids != self._ids.get(key):
+                self._write_ids(key, ids)
+    
+    def _shard_path(self, key: str) -> str:
+        """Path of a shard's file; shards not in the manifest have none yet."""
+        shard = self._shards.get(key)
+        return os.path.join(self.directory, shard['file']) if shard else ''
+    
+    def _ids_path(self, key: str) -> str:
+        """Path of the file listing a shard's task ids."""
+        return os.path.join(self.directory, f"shard-{self._shards[key]['number']}.ids")
+    
+    def _read_shard(self, key: str) -> Iterator[Dict]:
+        """Stream one shard's records, noting the file version read."""
+        path = self._shard_path(key)
+        self._loaded[key] = _file_signature(path)
+        if path:
+            yield from iter_snapshot(path)
+    
+    def _read_manifest(self):
+        """Read the shard list and next id, then any changed id files; no manifest means no tasks."""
+        self._remember()
+        try:
+            with open(self.path) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = {'version': self.VERSION, 'next_id': 1, 'shards': {}}
+        if manifest.get('version') != self.VERSION:
+            raise ValueError(f"{self.path} is not a version {self.VERSION} shard manifest")
+        shards = manifest['shards']
+        if any(key not in shards or shards[key]['number'] != self._shards[key]['number']
+               for key in self._ids):
+            # A different store replaced this one: forget every location
+            self._locations = array('H')
+            self._ids = {}
+            self._ids_seen = {}
+        self.next_id = manifest['next_id']
+        self._shards = shards
+        self._keys = {shard['number']: key for key, shard in self._shards.items()}
+        self._read_ids()
+    
+    def _write_manifest(self):
+        """Atomically write the manifest."""
+        manifest = {'version': self.VERSION, 'next_id': self.next_id, 'shards': self._shards}
+        self._write_atomic(self.path, lambda f: json.dump(manifest, f, **self.json_options))
+    
+    def _read_ids(self):
+        """Re-read the id files that changed since this process last read or wrote them."""
+        for key in self._shards:
+            path = self._ids_path(key)
+            signature = _file_signature(path)
+            if key in self._ids_seen and signature == self._ids_seen[key]:
+                continue
+            ids = array('q')
+            if signature is not None:
+                with open(path, 'rb') as f:
+                    ids.frombytes(f.read())
+                if sys.byteorder == 'big':
+                    ids.byteswap()
+            self._set_ids(key, ids)
+            self._ids_seen[key] = signature
+    
+    def _write_ids(self, key: str, ids: array):
+        """Atomically write a shard's sorted ids and point their locations at it."""
+        data = array('q', ids)
+        if sys.byteorder == 'big':
+            data.byteswap()
+        path = self._ids_path(key)
+        self._write_atomic(path, lambda f: f.write(data.tobytes()), binary=True)
+        self._set_ids(key, ids)
+        self._ids_seen[key] = _file_signature(path)
+    
+    def _set_ids(self, key: str, ids: array):
+        """Replace a shard's id list, updating the locations of the ids that left or joined it."""
+        number = self._shards[key]['number']
+        locations = self._locations
+        for task_id in self._ids.get(key, ()):
+            if locations[task_id] == number:
+                locations[task_id] = 0
+        if ids and len(locations) <= ids[-1]:
+            locations.frombytes(bytes(locations.itemsize * (ids[-1] + 1 - len(locations))))
+        for task_id in ids:
+            locations[task_id] = number
+        self._ids[key] = ids
+    
+    def close(self) -> None:
+        """Force batched shard writes to disk, then the manifest, and release the lock file."""
+        if self._unsynced:
+            for key in self._loaded:
+                path = self._shard_path(key)
+                if path and os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        os.fsync(f.fileno())
+        super().close()
+
+
+class MemoryStorage(TaskStorage):
+    """Storage that persists nothing; tasks live only in memory."""
+    
+    def __init__(self, path: Optional[str] = None, **options):
+        # File options such as fsync do not apply and are ignored
+        self.path = path
+    
+    def load(self) -> List[Dict]:
+        """Start with no tasks."""
+        return []
+    
+    def save(self, tasks: Iterable) -> None:
+        """Nothing to write."""
+    
+    def commit(self, changes: List[Change], tasks: Iterable) -> None:
+        """Nothing to write."""
+
+
+STORAGE_BACKENDS = {
+    'json': JsonFileStorage,
+    'journal': JournalStorage,
+    'binary': BinaryStorage,
+    'sqlite': SqliteStorage,
+    'sharded': ShardedStorage,
+    'memory': MemoryStorage,
+}
+
+# Data file used by each backend when none is given
+DEFAULT_DATA_FILES = {
+    'json': "data/tasks.json",
+    'journal': "data/tasks.json",
+    'binary': "data/tasks.bin",
+    'sqlite': "data/tasks.db",
+    'sharded': "data/shards/manifest.json",
+    'memory': None,
+}
+
+
+def create_storage(kind: str, path: str, **options) -> TaskStorage:
+    """Create a storage backend by name, passing any backend options on."""
+    try:
+        backend = STORAGE_BACKENDS[kind]
+    except KeyError:
+        raise ValueError(f"Unknown storage backend: {kind}")
+    return backend(path, **options)
@@ -4,25 +4,171 @@ Todo List Application
 A command-line todo list manager with file persistence.
 """
 
-import json
-import os
-from datetime import datetime, date
-from typing import List, Dict, Optional
+import argparse
+import base64
+import binascii
+import heapq
+import re
+from datetime import date, timedelta
+from contextlib import contextmanager, nullcontext
+from itertools import islice, repeat
+from operator import attrgetter, gt
+from typing import (Callable, ContextManager, Deque, IO, Iterable, Iterator, List, Dict,
+                    Optional, Tuple)
 import sys
+import time
+from collections import deque
+
+from columnar import ColumnarTaskStore
+from indexes import SortedIndex, TrigramIndex
+from recurrence import Occurrence, Recurrence, parse_recurrence
+from rendering import DEFAULT_ICON, OUTPUT_FORMATS, PRIORITY_ICONS, TaskRenderer
+from transfer import batches, format_for, read_tasks, write_tasks
+from validation import TaskValidator
+from storage import (Change, DEFAULT_DATA_FILES, FSYNC_POLICIES, STORAGE_BACKENDS,
+                     StoredChanges, TaskStorage, JsonFileStorage, create_storage)
+
+
+class CodeTable:
+    """Maps repeated strings (priorities, categories) to small integer codes."""
+    
+    def __init__(self, values: List[str] = ()):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+        for value in values:
+            self.code(value)
+    
+    def code(self, value: str) -> int:
+        """Return the code for a value, assigning a new one if needed."""
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        return code
+
+
+PRIORITY_CODES = CodeTable(["High", "Medium", "Low"])
+CATEGORY_CODES = CodeTable(["General"])
+
+
+def date_to_ordinal(value: Optional[str]):
+    """Store an ISO date (YYYY-MM-DD) as a day number; keep anything else unchanged."""
+    try:
+        parsed = date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return value
+    return parsed.toordinal() if parsed.isoformat() == value else value
+
+
+def ordinal_to_date(value) -> Optional[str]:
+    """Turn a day number back into an ISO date string."""
+    return date.fromordinal(value).isoformat() if isinstance(value, int) else value
+
+
+def _text(value, default: str) -> str:
+    """A stored priority or category as a string: the default for null, else str(value)."""
+    if isinstance(value, str):
+        return value
+    return default if value is None else str(value)
+
+
+def encode_cursor(sort: str, key: Tuple[int, int]) -> str:
+    """Make an opaque page token from the sort order and the last task's sort key."""
+    text = f"{sort}:{key[0]}:{key[1]}"
+    return base64.urlsafe_b64encode(text.encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str) -> Tuple[str, Tuple[int, int]]:
+    """Read back the sort order and sort key stored in a page token."""
+    try:
+        text = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('ascii')
+        sort, primary, task_id = text.split(':')
+        return sort, (int(primary), int(task_id))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid cursor: {token}") from None
 
 
 class Task:
-    """Represents a single task in the todo list."""
+    """Represents a single task in the todo list.
+    
+    Tasks use __slots__ instead of a per-object __dict__. Priority and
+    category are stored as codes into shared tables and dates as day
+    ordinals; the properties below still read and write plain strings.
+    
+    A task with a ``recurrence`` rule (see recurrence.py) repeats: its due
+    date is the first occurrence and the rest are worked out when needed.
+    """
+    
+    __slots__ = ('id', 'description', 'completed', '_priority', '_category',
+                 '_created', '_due', 'recurrence')
     
     def __init__(self, description: str, priority: str = "Medium", 
-                 due_date: Optional[str] = None, category: str = "General"):
+                 due_date: Optional[str] = None, category: str = "General",
+                 recurrence: Optional[str] = None):
         self.id = None  # Will be set by TaskManager
         self.description = description
         self.completed = False
         self.priority = priority
-        self.created_date = date.today().isoformat()
+        self._created = date.today().toordinal()
         self.due_date = due_date
         self.category = category
+        self.recurrence = recurrence
+    
+    @property
+    def priority(self) -> str:
+        """Priority level (High/Medium/Low)."""
+        return PRIORITY_CODES.values[self._priority]
+    
+    @priority.setter
+    def priority(self, value: str):
+        self._priority = PRIORITY_CODES.code(value)
+    
+    @property
+    def category(self) -> str:
+        """Task category."""
+        return CATEGORY_CODES.values[self._category]
+    
+    @category.setter
+    def category(self, value: str):
+        self._category = CATEGORY_CODES.code(value)
+    
+    @property
+    def created_date(self) -> str:
+        """Creation date as YYYY-MM-DD."""
+        return ordinal_to_date(self._created)
+    
+    @created_date.setter
+    def created_date(self, value: str):
+        self._created = date_to_ordinal(value)
+    
+    @property
+    def due_date(self) -> Optional[str]:
+        """Due date as YYYY-MM-DD, or None."""
+        return ordinal_to_date(self._due)
+    
+    @due_date.setter
+    def due_date(self, value: Optional[str]):
+        self._due = date_to_ordinal(value)
+    
+    @property
+    def priority_code(self) -> int:
+        """Code of the priority in PRIORITY_CODES."""
+        return self._priority
+    
+    @property
+    def category_code(self) -> int:
+        """Code of the category in CATEGORY_CODES."""
+        return self._category
+    
+    @property
+    def due_ordinal(self) -> Optional[int]:
+        """Due date as a day ordinal, or None if unset or not an ISO date."""
+        return self._due if isinstance(self._due, int) else None
+    
+    @property
+    def created_ordinal(self) -> Optional[int]:
+        """Creation date as a day ordinal, or None if not an ISO date."""
+        return self._created if isinstance(self._created, int) else None
     
     def to_dict(self) -> Dict:
         """Convert task to dictionary for JSON serialization."""
@@ -33,13 +179,19 @@ class Task:
             'priority': self.priority,
             'created_date': self.created_date,
             'due_date': self.due_date,
-            'category': self.category
+            'category': self.category,
+            'recurrence': self.recurrence
         }
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'Task':
-        """Create task from dictionary."""
-        task = cls(data['description'], data['priority'], data['due_date'], data['category'])
+        """Create task from dictionary.
+        
+        A stored priority or category that is not a string is loaded as text,
+        or as the default when it is null, rather than failing the whole load.
+        """
+        task = cls(data['description'], _text(data['priority'], "Medium"), data['due_date'],
+                   _text(data['category'], "General"), data.get('recurrence'))
         task.id = data['id']
         task.completed = data['completed']
         task.created_date = data['created_date']
@@ -48,102 +200,532 @@ class Task:
     def __str__(self) -> str:
         """String representation of task."""
         status = "[x]" if self.completed else "[ ]"
-        priority_icon = {"High": "🔴", "Medium": "🟡", "Low": "🟢"}.get(self.priority, "⚪")
-        due_info = f" (Due: {self.due_date})" if self.due_date else ""
+        priority_icon = PRIORITY_ICONS.get(self.priority, DEFAULT_ICON)
         return f"{self.id:2d} | {status} | {priority_icon} {self.priority:6s} | {self.due_date or 'No due date':10s} | {self.description}"
 
 
 class TaskManager:
-    """Manages the collection of tasks."""
+    """Manages the collection of tasks.
+    
+    Several processes can share one data file. Every change is made while
+    holding the storage lock, after merging in whatever other processes
+    have written since this one last read or wrote the file.
+    
+    The last ``history_limit`` changes can be undone and redone. History
+    keeps the Change records themselves, which point at the live Task
+    objects, so it costs memory per edit rather than a copy of the list.
     
-    def __init__(self, data_file: str = "data/tasks.json"):
+    With storage that supports shards (ShardedStorage), tasks are loaded a
+    category at a time as commands need them: a query filtered by category
+    reads only that category's shard, and editing a task by id reads only
+    the shard that holds it. Anything else loads every shard.
+    """
+    
+    # Fields that update_task() is allowed to change
+    UPDATABLE_FIELDS = ('description', 'completed', 'priority', 'due_date', 'category',
+                        'recurrence')
+    
+    # Orders accepted by list_page(); priority runs High, Medium, Low, then others
+    SORT_ORDERS = ('id', 'priority', 'due', 'created')
+    PRIORITY_RANKS = {'high': 0, 'medium': 1, 'low': 2}
+    
+    def __init__(self, data_file: str = "data/tasks.json",
+                 storage: Optional[TaskStorage] = None, columnar: bool = False,
+                 history_limit: int = 100):
         self.data_file = data_file
-        self.tasks: List[Task] = []
+        self.storage = storage if storage is not None else JsonFileStorage(data_file)
+        # Optional struct-of-arrays copy used for bulk filtering and reporting
+        self.columnar = columnar
+        self.columns: Optional[ColumnarTaskStore] = None
+        # Tasks keyed by id; dicts keep insertion order, so this is also the list order
+        self._tasks: Dict[int, Task] = {}
+        self._reset_indexes()
         self.next_id = 1
+        # Changes not yet written to storage, and the nesting depth of transaction()
+        self._pending: List[Change] = []
+        self._transaction_depth = 0
+        # Transaction depth up to which each operation is its own undo step:
+        # 0, or 1 inside transaction(steps=True)
+        self._step_level = 0
+        # Nesting depth of _exclusive(); the storage lock is held while positive
+        self._lock_depth = 0
+        # When False, changes wait in memory until flush() is called (write-behind)
+        self.autoflush = True
+        # Undo steps, oldest first; each is the list of changes one operation or
+        # transaction made. Undone steps move to _redo as the changes that undid them.
+        self._history: Deque[List[Change]] = deque(maxlen=history_limit)
+        self._redo: List[List[Change]] = []
+        # Changes of the operation or transaction in progress
+        self._step: List[Change] = []
+        # Shared by everything that checks input, so its lookup tables stay warm
+        self.validator = TaskValidator()
         self.load_tasks()
     
+    @property
+    def tasks(self) -> List[Task]:
+        """All tasks in the order they were added."""
+        self._load_shards()
+        return list(self._tasks.values())
+    
+    @property
+    def pending_count(self) -> int:
+        """Number of changes not yet written to storage (see autoflush and flush())."""
+        return len(self._pending)
+    
+    def __len__(self) -> int:
+        """Number of tasks."""
+        self._load_shards()
+        return len(self._tasks)
+    
     def add_task(self, description: str, priority: str = "Medium", 
-                 due_date: Optional[str] = None, category: str = "General") -> Task:
+                 due_date: Optional[str] = None, category: str = "General",
+                 recurrence: Optional[str] = None) -> Task:
         """Add a new task to the list."""
-        task = Task(description, priority, due_date, category)
-        task.id = self.next_id
-        self.next_id += 1
-        self.tasks.append(task)
-        self.save_tasks()
+        task = Task(description, priority, due_date, category, recurrence)
+        with self._exclusive():
+            # A shard is rewritten from the tasks in memory, so it must be loaded
+            self._load_shards([category])
+            task.id = self.next_id
+            self.next_id += 1
+            self._insert(task)
+            self._record(Change('add', task))
         return task
     
+    def add_tasks(self, tasks: Iterable[Dict]) -> List[Task]:
+        """Add many tasks, given as dictionaries of add_task() arguments.
+        
+        All the tasks are written to storage in a single commit.
+        """
+        with self.transaction():
+            return [self.add_task(**fields) for fields in tasks]
+    
+    def import_tasks(self, records: Iterable[Dict],
+                     batch_size: int = 10_000) -> Tuple[int, List[Tuple[int, str]]]:
+        """Add tasks from a stream of records, such as transfer.read_tasks() yields.
+        
+        Records are read, validated and added a batch at a time, each batch
+        getting a block of new ids (ids in the records are ignored). Invalid
+        records are skipped. Everything is written to storage in one commit
+        at the end. Returns the number added and (record number, error)
+        for each record skipped.
+        """
+        added = 0
+        rejected = []
+        number = 0
+        with self.transaction():
+            for batch in batches(records, batch_size):
+                valid = []
+                for record, mask in zip(batch, self.validator.check_records(batch)):
+                    number += 1
+                    if mask:
+                        rejected.append((number, TaskValidator.first_error(mask)))
+                    else:
+                        valid.append(record)
+                self._load_shards({record.get('category') or 'General' for record in valid})
+                first_id = self.next_id
+                self.next_id += len(valid)
+                for task_id, record in enumerate(valid, first_id):
+                    task = Task(record['description'].strip(), record.get('priority') or 'Medium',
+                                record.get('due_date'), record.get('category') or 'General',
+                                record.get('recurrence'))
+                    task.id = task_id
+                    task.completed = record.get('completed') or False
+                    if record.get('created_date'):
+                        task.created_date = record['created_date']
+                    self._insert(task)
+                    self._record(Change('add', task))
+                added += len(valid)
+        return added, rejected
+    
     def get_task(self, task_id: int) -> Optional[Task]:
         """Get a task by its ID."""
-        for task in self.tasks:
-            if task.id == task_id:
-                return task
-        return None
+        task = self._tasks.get(task_id)
+        if task is None and self.storage.supports_shards:
+            category = self.storage.shard_of(task_id)
+            if category is not None:
+                self._load_shards([category])
+                task = self._tasks.get(task_id)
+        return task
+    
+    def update_task(self, task_id: int, **fields) -> bool:
+        """Change one or more fields of a task.
+        
+        Raises ValueError for an unknown field or an invalid value.
+        """
+        for name in fields:
+            if name not in self.UPDATABLE_FIELDS:
+                raise ValueError(f"Unknown task field: {name}")
+        # Checked before the task leaves its indexes, since a value that
+        # cannot be indexed would leave it out of them for good
+        mask = self.validator.check_update(fields)
+        if mask:
+            raise ValueError(TaskValidator.first_error(mask))
+        
+        with self._exclusive():
+            task = self.get_task(task_id)
+            if task:
+                if 'category' in fields:
+                    self._load_shards([fields['category']])
+                previous = {name: getattr(task, name) for name in fields}
+                self._apply(task, fields)
+                self._record(Change('update', task, fields, previous))
+                return True
+        return False
     
     def complete_task(self, task_id: int) -> bool:
         """Mark a task as complete."""
-        task = self.get_task(task_id)
-        if task:
-            task.completed = True
-            self.save_tasks()
-            return True
-        return False
+        return self.update_task(task_id, completed=True)
     
     def uncomplete_task(self, task_id: int) -> bool:
         """Mark a task as incomplete."""
-        task = self.get_task(task_id)
-        if task:
-            task.completed = False
-            self.save_tasks()
-            return True
-        return False
+        return self.update_task(task_id, completed=False)
     
     def delete_task(self, task_id: int) -> bool:
         """Delete a task."""
-        task = self.get_task(task_id)
-        if task:
-            self.tasks.remove(task)
-            self.save_tasks()
-            return True
+        with self._exclusive():
+            task = self.get_task(task_id)
+            if task:
+                self._remove(task)
+                self._record(Change('delete', task))
+                return True
         return False
     
     def list_tasks(self, priority: Optional[str] = None, 
                    status: Optional[str] = None, 
                    category: Optional[str] = None) -> List[Task]:
-        """List tasks with optional filtering."""
-        filtered_tasks = self.tasks.copy()
+        """List tasks with optional filtering.
+        
+        Each filter maps to a maintained index of task ids. The matching ids
+        are found by walking the smallest index and checking membership in
+        the others, so the cost follows the size of the result, not the list.
+        With the columnar store enabled the filters run as array scans instead,
+        and a backend that supports queries answers them with indexed SQL.
+        """
+        if self._storage_queries():
+            return self._from_records(self.storage.query_tasks(
+                priority or None, self._status_filter(status), category or None))
+        self._need_category(category)
+        
+        if self.columns is not None:
+            return self._list_columnar(priority, status, category)
+        
+        matching_ids = self._matching_ids(priority, status, category)
+        if matching_ids is None:
+            return list(self._tasks.values())
+        return [self._tasks[task_id] for task_id in sorted(matching_ids)]
+    
+    def _matching_ids(self, priority: Optional[str], status: Optional[str],
+                      category: Optional[str]) -> Optional[set]:
+        """Intersect the indexes for the given filters, or return None if there are none.
+        
+        With a single filter its index set itself is returned; do not modify it.
+        """
+        indexes = []
         
         if priority:
-            filtered_tasks = [t for t in filtered_tasks if t.priority.lower() == priority.lower()]
+            indexes.append(self._by_priority.get(priority.casefold(), set()))
+        
+        completed = self._status_filter(status)
+        if completed is not None:
+            indexes.append(self._by_status[completed])
+        
+        if category:
+            indexes.append(self._by_category.get(category.casefold(), set()))
         
+        if not indexes:
+            return None
+        if len(indexes) == 1:
+            return indexes[0]
+        
+        indexes.sort(key=len)
+        return indexes[0].intersection(*indexes[1:])
+    
+    def list_page(self, priority: Optional[str] = None, status: Optional[str] = None,
+                  category: Optional[str] = None, sort: str = 'id', limit: Optional[int] = None,
+                  offset: int = 0, cursor: Optional[str] = None) -> Tuple[List[Task], Optional[str]]:
+        """List one page of tasks in the given order.
+        
+        Returns the tasks and a cursor for the next page (None on the last
+        page). Passing that cursor back continues after the last task shown,
+        even if tasks were added or removed in the meantime. Each order has
+        its own sorted index, built on first use; a page is read by walking
+        it from the cursor and keeping tasks that match the filters, so the
+        full result is never sorted.
+        """
+        if sort not in self.SORT_ORDERS:
+            raise ValueError(f"Unknown sort order: {sort}")
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError("Limit and offset cannot be negative")
+        self._need_category(category)
+        key = self._sort_key(sort)
+        index = self._sort_indexes.get(sort)
+        if index is None:
+            index = self._sort_indexes[sort] = SortedIndex(
+                (key(task), task.id) for task in self._tasks.values())
+        
+        if cursor is None:
+            ids = index.between()
+        else:
+            cursor_sort, after = decode_cursor(cursor)
+            if cursor_sort != sort:
+                raise ValueError(f"Cursor was made for --sort {cursor_sort}")
+            ids = index.after(after)
+        matching_ids = self._matching_ids(priority, status, category)
+        if matching_ids is not None:
+            ids = filter(matching_ids.__contains__, ids)
+        
+        if limit is None:
+            return list(map(self._tasks.__getitem__, islice(ids, offset, None))), None
+        # One extra task tells whether there is a next page
+        page = list(map(self._tasks.__getitem__, islice(ids, offset, offset + limit + 1)))
+        if len(page) <= limit or not limit:
+            return page[:limit], None
+        last = page[limit - 1]
+        return page[:limit], encode_cursor(sort, (key(last), last.id))
+    
+    def _sort_key(self, sort: str) -> Callable[[Task], int]:
+        """The sort key of a task for a list_page() order; ties go by id."""
+        if sort == 'priority':
+            ranks = self.PRIORITY_RANKS
+            return lambda task: ranks.get(task.priority.casefold(), len(ranks))
+        if sort == 'due':
+            # Tasks without a due date come last
+            return lambda task: task.due_ordinal or sys.maxsize
+        if sort == 'created':
+            return lambda task: task.created_ordinal or sys.maxsize
+        return lambda task: 0
+    
+    @staticmethod
+    def _status_filter(status: Optional[str]) -> Optional[bool]:
+        """Turn a 'complete'/'incomplete' status filter into a completed flag."""
         if status:
             if status.lower() == "complete":
-                filtered_tasks = [t for t in filtered_tasks if t.completed]
-            elif status.lower() == "incomplete":
-                filtered_tasks = [t for t in filtered_tasks if not t.completed]
+                return True
+            if status.lower() == "incomplete":
+                return False
+        return None
+    
+    def _storage_queries(self) -> bool:
+        """Whether queries can be handed to the storage backend.
+        
+        Only when every change has been written, so the backend's answer
+        matches the tasks in memory.
+        """
+        return self.storage.supports_queries and not self._pending
+    
+    def _from_records(self, records: Iterable[Dict]) -> List[Task]:
+        """Map records returned by a storage query to tasks."""
+        tasks = self._tasks
+        return [tasks.get(record['id']) or Task.from_dict(record) for record in records]
+    
+    @staticmethod
+    def _matching_codes(table: CodeTable, value: str) -> List[int]:
+        """Codes whose name equals ``value`` ignoring case."""
+        value = value.casefold()
+        return [code for code, name in enumerate(table.values) if name.casefold() == value]
+    
+    def _list_columnar(self, priority: Optional[str], status: Optional[str],
+                       category: Optional[str]) -> List[Task]:
+        """list_tasks() implemented as a scan of the columnar store."""
+        filters = {}
+        if priority:
+            filters['priority_codes'] = self._matching_codes(PRIORITY_CODES, priority)
+        completed = self._status_filter(status)
+        if completed is not None:
+            filters['completed'] = completed
+        if category:
+            filters['category_codes'] = self._matching_codes(CATEGORY_CODES, category)
+        return [self._tasks[task_id] for task_id in self.columns.select(**filters)]
+    
+    def search_tasks(self, query: str, all_terms: bool = False) -> List[Task]:
+        """Search tasks by description.
+        
+        By default the whole query must appear in the description; with
+        ``all_terms`` every whitespace-separated word must appear somewhere.
+        """
+        if self._storage_queries():
+            return self._from_records(self.storage.search(query, all_terms))
+        
+        self._load_shards()
+        if self._text_index is None:
+            # Built on first search rather than on every load
+            self._text_index = TrigramIndex()
+            for task in self._tasks.values():
+                self._text_index.add(task.id, task.description)
+        return [self._tasks[task_id] for task_id in self._text_index.search(query, all_terms)]
+    
+    def upcoming(self, n: int, today: Optional[date] = None,
+                 priority: Optional[str] = None, category: Optional[str] = None) -> List[Task]:
+        """The ``n`` incomplete tasks due soonest, from ``today`` (default: the current date) on.
+        
+        A recurring task is listed once, as an Occurrence on its next date.
+        Like one-off tasks, series come from an index kept in date order (see
+        _next_occurrences()), so a query reads only as far as it needs.
+        """
+        start = (today or date.today()).toordinal()
+        self._need_category(category)
+        self._build_date_indexes()
+        next_index = self._next_occurrences(start)
+        if not len(next_index):
+            return self._due_between(start, None, n, priority, category)
+        filters = self._id_filters(priority, category)
+        due = self._due_index.items(start)
+        series = next_index.items()
+        if filters:
+            due = (item for item in due if all(item[1] in f for f in filters))
+            series = (item for item in series if all(item[1] in f for f in filters))
+        return [self._dated(day, task_id)
+                for day, task_id in islice(heapq.merge(due, series), max(n, 0))]
+    
+    def overdue(self, today: Optional[date] = None, priority: Optional[str] = None,
+                category: Optional[str] = None) -> List[Task]:
+        """Incomplete tasks due before ``today`` (default: the current date), oldest first.
+        
+        Recurring tasks are never overdue: their occurrences are not stored,
+        so there is nothing to complete.
+        """
+        end = (today or date.today()).toordinal()
+        return self._due_between(None, end, None, priority, category)
+    
+    def occurrences(self, start: date, end: date, priority: Optional[str] = None,
+                    category: Optional[str] = None) -> List[Task]:
+        """Incomplete tasks due from ``start`` to ``end`` inclusive, in date order.
         
+        Each recurring task appears once per date it falls on in the window,
+        as an Occurrence. Only series that begin before ``end`` are expanded.
+        """
+        first_day, stop = start.toordinal(), end.toordinal() + 1
+        self._need_category(category)
+        self._build_date_indexes()
+        filters = self._id_filters(priority, category)
+        due = {task_id: None for task_id in self._due_index.between(first_day, stop)
+               if all(task_id in f for f in filters)}
+        due.update((task_id, first) for first, task_id in self._recurring_index.items(None, stop)
+                   if all(task_id in f for f in filters))
+        # Gathered in id order, so the stable sort by date leaves ties in id order;
+        # each series is already in date order, which the sort merges cheaply
+        tasks = []
+        for task_id in sorted(due):
+            task = self._tasks[task_id]
+            first = due[task_id]
+            if first is None:
+                tasks.append(task)
+            else:
+                days = self._rule(task).occurrences(first, first_day, stop)
+                tasks.extend(map(Occurrence, repeat(task), days))
+        tasks.sort(key=attrgetter('due_ordinal'))
+        return tasks
+    
+    def _due_between(self, start: Optional[int], end: Optional[int], limit: Optional[int],
+                     priority: Optional[str], category: Optional[str]) -> List[Task]:
+        """Walk the due-date index in date order, keeping up to ``limit`` matching tasks."""
+        self._need_category(category)
+        self._build_date_indexes()
+        filters = self._id_filters(priority, category)
+        ids = self._due_index.between(start, end)
+        if filters:
+            ids = (task_id for task_id in ids if all(task_id in f for f in filters))
+        if limit is not None:
+            ids = islice(ids, max(limit, 0))
+        return list(map(self._tasks.__getitem__, ids))
+    
+    def _id_filters(self, priority: Optional[str], category: Optional[str]) -> List[set]:
+        """The id sets a task must be in to have the given priority and category."""
+        filters = []
+        if priority:
+            filters.append(self._by_priority.get(priority.casefold(), set()))
         if category:
-            filtered_tasks = [t for t in filtered_tasks if t.category.lower() == category.lower()]
+            filters.append(self._by_category.get(category.casefold(), set()))
+        return filters
+    
+    def _build_date_indexes(self):
+        """Build the due-date and recurring-series indexes on first use rather than on every load."""
+        if self._due_index is None:
+            due, series = [], []
+            for task in self._tasks.values():
+                if task.completed:
+                    continue
+                first = self._series_start(task)
+                if first is not None:
+                    series.append((first, task.id))
+                elif task.due_ordinal:
+                    due.append((task.due_ordinal, task.id))
+            self._due_index = SortedIndex(due)
+            self._recurring_index = SortedIndex(series)
+            self._next_index = None
+    
+    def _next_occurrences(self, start: int) -> SortedIndex:
+        """The recurring tasks keyed by their next date on or after ``start``.
         
-        return filtered_tasks
+        The index is kept for the last ``start`` asked for. A later start
+        moves on only the series whose next date has passed; an earlier one
+        rebuilds the index.
+        """
+        if self._next_index is None or start < self._next_from:
+            self._next_days = {task_id: self._rule(self._tasks[task_id]).next_after(first, start)
+                               for first, task_id in self._recurring_index.items()}
+            self._next_index = SortedIndex((day, task_id)
+                                           for task_id, day in self._next_days.items())
+        elif start > self._next_from:
+            moved = []
+            for _, task_id in self._next_index.pop_before(start):
+                task = self._tasks[task_id]
+                day = self._rule(task).next_after(self._series_start(task), start)
+                self._next_days[task_id] = day
+                moved.append((day, task_id))
+            self._next_index.add_many(moved)
+        self._next_from = start
+        return self._next_index
+    
+    def _dated(self, day: int, task_id: int) -> Task:
+        """The task due on ``day``: the task itself, or an Occurrence of a recurring one."""
+        task = self._tasks[task_id]
+        return task if self._rule(task) is None else Occurrence(task, day)
+    
+    @staticmethod
+    def _rule(task: Task) -> Optional[Recurrence]:
+        """The task's parsed recurrence rule; None if it has none or it does not parse."""
+        if not task.recurrence:
+            return None
+        try:
+            return parse_recurrence(task.recurrence)
+        except ValueError:
+            return None
     
-    def search_tasks(self, query: str) -> List[Task]:
-        """Search tasks by description."""
-        query = query.lower()
-        return [task for task in self.tasks if query in task.description.lower()]
+    def _series_start(self, task: Task) -> Optional[int]:
+        """First day of a recurring task's series, or None for a task that does not repeat."""
+        if self._rule(task) is None:
+            return None
+        return task.due_ordinal or task.created_ordinal
     
     def get_statistics(self) -> Dict:
-        """Get task statistics."""
-        total = len(self.tasks)
-        completed = len([t for t in self.tasks if t.completed])
-        pending = total - completed
+        """Get task statistics from the counters, the columnar store or the storage backend."""
+        self._load_shards()
+        total = len(self._tasks)
         
-        priorities = {}
-        for task in self.tasks:
-            priorities[task.priority] = priorities.get(task.priority, 0) + 1
+        if self._storage_queries():
+            counts = self.storage.statistics()
+            total = counts['total']
+            completed = counts['completed']
+            priorities = counts['priorities']
+            categories = counts['categories']
+            categories_completed = counts['categories_completed']
+        elif self.columns is not None:
+            columns = self.columns
+            completed = columns.count(completed=True)
+            priorities = {PRIORITY_CODES.values[code]: count
+                          for code, count in columns.count_by('priority').items()}
+            categories = {CATEGORY_CODES.values[code]: count
+                          for code, count in columns.count_by('category').items()}
+            categories_completed = {CATEGORY_CODES.values[code]: count
+                                    for code, count in columns.count_by('category', completed=True).items()}
+        else:
+            completed = len(self._by_status[True])
+            priorities = dict(self._priority_counts)
+            categories = dict(self._category_counts)
+            categories_completed = dict(self._category_completed_counts)
         
-        categories = {}
-        for task in self.tasks:
-            categories[task.category] = categories.get(task.category, 0) + 1
+        pending = total - completed
         
         return {
             'total': total,
@@ -151,36 +733,515 @@ class TaskManager:
             'pending': pending,
             'completion_rate': (completed / total * 100) if total > 0 else 0,
             'priorities': priorities,
-            'categories': categories
+            'categories': categories,
+            'categories_completed': categories_completed
         }
     
+    @contextmanager
+    def transaction(self, steps: bool = False) -> Iterator['TaskManager']:
+        """Group changes so they are written to storage in one commit.
+        
+        Changes made inside the block are kept in memory and flushed when the
+        outermost transaction ends. If the block raises, its changes are
+        undone in memory and nothing is written. The storage lock is held
+        for the whole block, so other processes cannot write in between.
+        
+            with manager.transaction():
+                manager.add_task("Buy milk")
+                manager.complete_task(3)
+        
+        The block is normally a single undo step, and undo() and redo() are
+        not allowed inside it. With ``steps`` (outermost transaction only),
+        each operation stays its own undo step and undo() and redo() work
+        inside the block as they would outside it.
+        """
+        with self._exclusive():
+            start = len(self._pending)
+            step_start = len(self._step)
+            next_id = self.next_id
+            steps = steps and not self._transaction_depth
+            if steps:
+                history, redo = list(self._history), list(self._redo)
+            self._transaction_depth += 1
+            if steps:
+                self._step_level = 1
+            try:
+                yield self
+            except BaseException:
+                self._transaction_depth -= 1
+                self._rollback(start)
+                del self._step[step_start:]
+                self.next_id = next_id
+                if steps:
+                    self._step_level = 0
+                    self._history = deque(history, maxlen=self._history.maxlen)
+                    self._redo = redo
+                raise
+            self._transaction_depth -= 1
+            if steps:
+                self._step_level = 0
+            if self._transaction_depth <= self._step_level:
+                self._end_step()
+                if self.autoflush and not self._transaction_depth:
+                    self.flush()
+    
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Hold the storage lock, first merging in other processes' changes."""
+        outermost = not self._lock_depth
+        self._lock_depth += 1
+        try:
+            with self.storage.lock() if outermost else nullcontext():
+                if outermost:
+                    self._merge(self.storage.sync())
+                yield
+        finally:
+            self._lock_depth -= 1
+    
+    def refresh(self) -> int:
+        """Pick up changes that other processes have written to storage.
+        
+        Nothing is re-read unless the data has changed, and then only the
+        changed records where the backend can tell which they are (see
+        TaskStorage.sync()). Returns the number of tasks added, changed or
+        removed.
+        """
+        with self.storage.lock():
+            return self._merge(self.storage.sync())
+    
+    def watch(self, interval: float = 1.0) -> Iterator[int]:
+        """Poll storage every ``interval`` seconds, yielding refresh() counts when tasks change.
+        
+            for changed in manager.watch():
+                print(f"{changed} tasks changed")
+        """
+        while True:
+            changed = self.refresh()
+            if changed:
+                yield changed
+            time.sleep(interval)
+    
+    def _merge(self, changes: Optional[StoredChanges]) -> int:
+        """Bring the tasks in memory up to date with changes read from storage.
+        
+        Returns the number of tasks added, changed or removed.
+        """
+        if self.storage.supports_shards:
+            # Other processes may have used ids in shards this one has not loaded
+            self.next_id = max(self.next_id, self.storage.next_id)
+        if changes is None:
+            return 0
+        records = changes.records
+        merged = 0
+        if changes.complete:
+            if changes.shards is None:
+                stale = [task for task_id, task in self._tasks.items() if task_id not in records]
+            else:
+                # Only the tasks of these shards were re-read
+                stale = [self._tasks[task_id] for key in changes.shards
+                         for task_id in self._by_category.get(key, ()) if task_id not in records]
+            for task in stale:
+                self._remove(task)
+                merged += 1
+        for task_id, record in records.items():
+            task = self._tasks.get(task_id)
+            if record is None:
+                if task is not None:
+                    self._remove(task)
+                    merged += 1
+            elif task is None:
+                if 'description' in record:
+                    self._insert(Task.from_dict(record))
+                    self.next_id = max(self.next_id, task_id + 1)
+                    merged += 1
+            else:
+                # Update in place so the task keeps its position in the list
+                current = task.to_dict()
+                fields = {name: value for name, value in record.items()
+                          if name != 'id' and current.get(name) != value}
+                if fields:
+                    self._apply(task, fields)
+                    merged += 1
+        return merged
+    
+    def flush(self):
+        """Write all pending changes to storage.
+        
+        If the write fails, the changes stay pending and the next flush retries them.
+        """
+        if self._pending:
+            with self._exclusive():
+                changes, self._pending = self._pending, []
+                try:
+                    self.storage.commit(changes, self._commit_tasks(changes))
+                except BaseException:
+                    # Still unsaved: keep them for the next flush
+                    self._pending[:0] = changes
+                    raise
+    
+    def _commit_tasks(self, changes: List[Change]) -> Iterable[Task]:
+        """The tasks storage.commit() needs: with sharded storage, only those of the shards it rewrites."""
+        if not self.storage.supports_shards:
+            return self._tasks.values()
+        return [self._tasks[task_id] for key in self.storage.touched_shards(changes)
+                for task_id in self._by_category.get(key, ())]
+    
+    def _record(self, change: Change):
+        """Queue a change for storage, writing it now unless in a transaction or autoflush is off."""
+        self._pending.append(change)
+        self._step.append(change)
+        if self._transaction_depth <= self._step_level:
+            self._end_step()
+            if self.autoflush and not self._transaction_depth:
+                self.flush()
+    
+    def _end_step(self):
+        """Add the finished operation's changes to the undo history."""
+        if self._step:
+            self._history.append(self._step)
+            self._step = []
+            self._redo.clear()
+    
+    def undo(self) -> int:
+        """Undo the last operation or transaction; returns the number of changes undone."""
+        return self._replay(self._history, self._redo)
+    
+    def redo(self) -> int:
+        """Redo the last undone operation; returns the number of changes redone."""
+        return self._replay(self._redo, self._history)
+    
+    def _replay(self, source: List[List[Change]], target: List[List[Change]]) -> int:
+        """Revert the newest step of ``source`` and push the reverting changes onto ``target``.
+        
+        Changes to tasks that another process has since deleted (or
+        re-added) are skipped.
+        """
+        if self._transaction_depth > self._step_level:
+            raise RuntimeError("Cannot undo or redo inside a transaction")
+        with self._exclusive():
+            if not source:
+                return 0
+            inverse = self._revert_all(source.pop())
+            if inverse:
+                target.append(inverse)
+                self._pending.extend(inverse)
+                if self.autoflush and not self._transaction_depth:
+                    self.flush()
+            return len(inverse)
+    
+    def _rollback(self, start: int):
+        """Undo, in memory, the pending changes from position ``start`` on."""
+        self._revert_all(self._pending[start:])
+        del self._pending[start:]
+    
+    def _revert_all(self, changes: List[Change]) -> List[Change]:
+        """Undo changes in memory, newest first; returns the changes that do so."""
+        last_id = next(reversed(self._tasks), 0)
+        inverse = [change for change in map(self._revert, reversed(changes))
+                   if change is not None]
+        # Re-added tasks were appended; put them back in their place in the list
+        ids = [last_id] + [change.task.id for change in inverse if change.op == 'add']
+        if any(map(gt, ids, ids[1:])):
+            self._tasks = dict(sorted(self._tasks.items()))
+        return inverse
+    
+    def _revert(self, change: Change) -> Optional[Change]:
+        """Undo one change in memory; returns the change that does so, or None if it no longer applies."""
+        task = self._tasks.get(change.task.id)
+        if change.op == 'delete':
+            if task is not None:
+                return None
+            self._insert(change.task)
+            return Change('add', change.task)
+        if task is None:
+            return None
+        if change.op == 'add':
+            self._remove(task)
+            return Change('delete', task)
+        current = {name: getattr(task, name) for name in change.previous}
+        self._apply(task, change.previous)
+        return Change('update', task, change.previous, current)
+    
+    def _insert(self, task: Task):
+        """Store a task and add it to every index."""
+        self._tasks[task.id] = task
+        self._index_task(task)
+        if self._text_index is not None:
+            self._text_index.add(task.id, task.description)
+    
+    def _remove(self, task: Task):
+        """Drop a task and remove it from every index."""
+        del self._tasks[task.id]
+        self._unindex_task(task)
+        if self._text_index is not None:
+            self._text_index.remove(task.id)
+        if self.columns is not None:
+            self.columns.remove(task.id)
+    
+    def _apply(self, task: Task, fields: Dict):
+        """Set fields on a task and refresh the indexes they affect."""
+        self._unindex_task(task)
+        for name, value in fields.items():
+            setattr(task, name, value)
+        self._index_task(task)
+        if 'description' in fields and self._text_index is not None:
+            self._text_index.remove(task.id)
+            self._text_index.add(task.id, task.description)
+    
+    def _reset_indexes(self):
+        """Clear the indexes used by list_tasks() and search_tasks()."""
+        self._by_priority: Dict[str, set] = {}
+        self._by_status: Dict[bool, set] = {True: set(), False: set()}
+        self._by_category: Dict[str, set] = {}
+        self._text_index: Optional[TrigramIndex] = None
+        # Due dates of incomplete tasks, for upcoming() and overdue(), and the
+        # first days of incomplete recurring tasks; recurring ones are only in the latter
+        self._due_index: Optional[SortedIndex] = None
+        self._recurring_index: Optional[SortedIndex] = None
+        # Recurring tasks keyed by their next date on or after _next_from, for
+        # upcoming(); built by its first call. _next_days maps id to that date.
+        self._next_index: Optional[SortedIndex] = None
+        self._next_days: Dict[int, int] = {}
+        self._next_from = 0
+        # Sorted (key, id) pairs for each list_page() order used so far
+        self._sort_indexes: Dict[str, SortedIndex] = {}
+        # Counters for get_statistics(), keyed by the exact priority/category text
+        self._priority_counts: Dict[str, int] = {}
+        self._category_counts: Dict[str, int] = {}
+        self._category_completed_counts: Dict[str, int] = {}
+        if self.columnar:
+            self.columns = ColumnarTaskStore()
+    
+    @staticmethod
+    def _adjust_count(counts: Dict[str, int], key: str, delta: int):
+        """Add ``delta`` to a counter, dropping keys that reach zero."""
+        count = counts.get(key, 0) + delta
+        if count:
+            counts[key] = count
+        else:
+            del counts[key]
+    
+    def _index_task(self, task: Task):
+        """Add a task to the secondary indexes and counters."""
+        self._by_priority.setdefault(task.priority.casefold(), set()).add(task.id)
+        self._by_status[bool(task.completed)].add(task.id)
+        self._by_category.setdefault(task.category.casefold(), set()).add(task.id)
+        self._adjust_count(self._priority_counts, task.priority, 1)
+        self._adjust_count(self._category_counts, task.category, 1)
+        if task.completed:
+            self._adjust_count(self._category_completed_counts, task.category, 1)
+        elif self._due_index is not None:
+            first = self._series_start(task)
+            if first is not None:
+                self._recurring_index.add(first, task.id)
+                if self._next_index is not None:
+                    day = self._rule(task).next_after(first, self._next_from)
+                    self._next_days[task.id] = day
+                    self._next_index.add(day, task.id)
+            elif task.due_ordinal:
+                self._due_index.add(task.due_ordinal, task.id)
+        for sort, index in self._sort_indexes.items():
+            index.add(self._sort_key(sort)(task), task.id)
+        if self.columns is not None:
+            self.columns.put(task.id, task.completed, task.priority_code,
+                             task.category_code, task.due_ordinal, task.description)
+    
+    def _unindex_task(self, task: Task):
+        """Remove a task from the secondary indexes and counters."""
+        for index, key in ((self._by_priority, task.priority.casefold()),
+                           (self._by_category, task.category.casefold())):
+            ids = index[key]
+            ids.discard(task.id)
+            if not ids:
+                del index[key]
+        self._by_status[bool(task.completed)].discard(task.id)
+        self._adjust_count(self._priority_counts, task.priority, -1)
+        self._adjust_count(self._category_counts, task.category, -1)
+        if task.completed:
+            self._adjust_count(self._category_completed_counts, task.category, -1)
+        elif self._due_index is not None:
+            first = self._series_start(task)
+            if first is not None:
+                self._recurring_index.remove(first, task.id)
+                if self._next_index is not None:
+                    self._next_index.remove(self._next_days.pop(task.id), task.id)
+            elif task.due_ordinal:
+                self._due_index.remove(task.due_ordinal, task.id)
+        for sort, index in self._sort_indexes.items():
+            index.remove(self._sort_key(sort)(task), task.id)
+    
+    def _need_category(self, category: Optional[str]):
+        """Load the tasks a query filtered to ``category`` can return (every task if no filter)."""
+        self._load_shards([category] if category else None)
+    
+    def _load_shards(self, categories: Optional[Iterable[str]] = None):
+        """Load the category shards not yet in memory (every one if ``categories`` is None).
+        
+        Only storage that supports shards loads lazily; with any other
+        backend every task was loaded up front and this does nothing.
+        """
+        if not self.storage.supports_shards:
+            return
+        if categories is not None:
+            categories = list(categories)
+        if not self.storage.needs_loading(categories):
+            return
+        with self._exclusive():
+            loaded = False
+            for record in self.storage.load_shards(categories):
+                # Tasks already in memory were merged from the same shard
+                if record['id'] not in self._tasks:
+                    task = Task.from_dict(record)
+                    self._insert(task)
+                    self.next_id = max(self.next_id, task.id + 1)
+                    loaded = True
+            if loaded:
+                # Keep the list in id order, whatever order the shards came in
+                self._tasks = dict(sorted(self._tasks.items()))
+    
     def save_tasks(self):
-        """Save tasks to file."""
-        os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
-        with open(self.data_file, 'w') as f:
-            json.dump([task.to_dict() for task in self.tasks], f, indent=2)
+        """Save a full snapshot of all tasks."""
+        self._load_shards()
+        with self.storage.lock():
+            self.storage.save(self._tasks.values())
     
     def load_tasks(self):
-        """Load tasks from file."""
+        """Load tasks from storage, discarding any unsaved changes.
+        
+        Records are streamed from the backend and turned into tasks one at a
+        time, so the raw file contents are never all in memory at once.
+        A corrupt data file is treated as empty.
+        """
+        self._tasks = {}
+        self._pending = []
+        self._history.clear()
+        self._redo.clear()
+        self._step = []
+        self._reset_indexes()
+        max_id = 0
         try:
-            if os.path.exists(self.data_file):
-                with open(self.data_file, 'r') as f:
-                    data = json.load(f)
-                    self.tasks = [Task.from_dict(task_data) for task_data in data]
-                    if self.tasks:
-                        self.next_id = max(task.id for task in self.tasks) + 1
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.tasks = []
-            self.next_id = 1
+            # Locked so a half-finished write by another process is never read
+            with self.storage.lock():
+                if self.storage.supports_shards:
+                    # Shards are read when a command first needs them (see _load_shards())
+                    self.storage.load_manifest()
+                    max_id = self.storage.next_id - 1
+                else:
+                    for task_data in self.storage.load():
+                        task = Task.from_dict(task_data)
+                        self._insert(task)
+                        if task.id > max_id:
+                            max_id = task.id
+        except ValueError:
+            self._tasks = {}
+            self._reset_indexes()
+            max_id = 0
+        self.next_id = max_id + 1
+
+
+# A token is a run of quoted strings, escaped characters and other non-space text
+_TOKEN = re.compile(r"""(?:"(?:[^"\\]|\\.)*"|'[^']*'|\\.|[^\s"'\\])+""", re.DOTALL)
+_TOKEN_PART = re.compile(r""""((?:[^"\\]|\\.)*)"|'([^']*)'|\\(.)|([^"'\\]+)""", re.DOTALL)
+_QUOTED_ESCAPE = re.compile(r'\\([\\"])')
+
+
+def tokenize(command: str) -> List[str]:
+    """
+    Split a command line into words the way a POSIX shell would.
+
+    Single or double quotes group words ("Buy groceries" is one token
+    without its quotes), and a backslash escapes the next character.
+    Raises ValueError for an unterminated quote.
+    """
+    if '"' not in command and "'" not in command and '\\' not in command:
+        return command.split()
+    tokens = []
+    position = 0
+    for match in _TOKEN.finditer(command):
+        if command[position:match.start()].strip():
+            raise ValueError("No closing quotation")
+        position = match.end()
+        parts = []
+        for double, single, escaped, plain in _TOKEN_PART.findall(match.group()):
+            # Inside double quotes only \" and \\ are escapes, as in a shell
+            parts.append(_QUOTED_ESCAPE.sub(r'\1', double) or single or escaped or plain)
+        tokens.append(''.join(parts))
+    if command[position:].strip():
+        raise ValueError("No closing quotation")
+    return tokens
+
+
+class OptionSpec:
+    """How a command option is written and parsed."""
+    
+    __slots__ = ('name', 'flags', 'takes_value', 'missing')
+    
+    def __init__(self, name: str, flags: Tuple[str, ...], takes_value: bool = True,
+                 missing: Optional[str] = None):
+        self.name = name
+        self.flags = flags
+        self.takes_value = takes_value
+        # Error shown when a value is expected but the command ends
+        self.missing = missing or f"Value required for {flags[-1]}"
+
+
+OPTION_SPECS = (
+    OptionSpec('priority', ('-p', '--priority'), missing="Priority level required"),
+    OptionSpec('due_date', ('-d', '--due-date'), missing="Due date required"),
+    OptionSpec('category', ('-c', '--category'), missing="Category required"),
+    OptionSpec('recurrence', ('-r', '--repeat'), missing="Recurrence rule required"),
+    OptionSpec('status', ('--status',), missing="Status required"),
+    OptionSpec('upcoming', ('--upcoming',), missing="Number of tasks required"),
+    OptionSpec('overdue', ('--overdue',), takes_value=False),
+    OptionSpec('from_date', ('--from',), missing="Start date required"),
+    OptionSpec('to_date', ('--to',), missing="End date required"),
+    OptionSpec('sort', ('--sort',)),
+    OptionSpec('limit', ('--limit',)),
+    OptionSpec('offset', ('--offset',)),
+    OptionSpec('cursor', ('--cursor',)),
+    OptionSpec('format', ('--format',)),
+)
+
+# Every spelling of every option, for a single dictionary lookup per flag
+OPTION_FLAGS: Dict[str, OptionSpec] = {flag: spec for spec in OPTION_SPECS for flag in spec.flags}
+OPTION_NAMES: Dict[str, OptionSpec] = {spec.name: spec for spec in OPTION_SPECS}
+
+# Command name -> (TodoApp handler, names of the options it accepts); filled by @command
+COMMANDS: Dict[str, Tuple[Callable, frozenset]] = {}
+
+
+def command(name: str, options: Iterable[str] = ()):
+    """Register a TodoApp method as the handler of a command."""
+    def register(handler: Callable) -> Callable:
+        COMMANDS[name] = (handler, frozenset(options))
+        return handler
+    return register
 
 
 class TodoApp:
-    """Main application class."""
+    """Main application class.
+    
+    Commands are looked up in the COMMANDS table, which the @command
+    decorator fills in as the handlers below are defined.
+    """
     
-    def __init__(self):
-        self.task_manager = TaskManager()
+    def __init__(self, task_manager: Optional[TaskManager] = None, output_format: str = 'table'):
+        self.task_manager = task_manager if task_manager is not None else TaskManager()
+        # Default for the --format option of list and search
+        self.output_format = output_format
         self.running = True
     
+    @command('help')
+    def handle_help(self, args: List[str], options: Dict):
+        """Handle help command."""
+        self.display_help()
+    
+    @command('quit')
+    def handle_quit(self, args: List[str], options: Dict):
+        """Handle quit command."""
+        print("Goodbye!")
+        self.running = False
+    
     def display_help(self):
         """Display help information."""
         help_text = """
@@ -192,7 +1253,11 @@ Commands:
   complete <id>                  - Mark task as complete
   uncomplete <id>                - Mark task as incomplete
   delete <id>                    - Delete a task
+  undo                           - Undo the last change
+  redo                           - Redo the last undone change
   search <query>                 - Search tasks
+  import <file>                  - Add tasks from a CSV or JSON Lines file
+  export <file> [options]        - Write tasks to a CSV or JSON Lines file
   stats                          - Show statistics
   help                           - Show this help
   quit                           - Exit application
@@ -201,16 +1266,38 @@ Options for add:
   -p, --priority <level>         - Priority (High/Medium/Low)
   -d, --due-date <date>          - Due date (YYYY-MM-DD)
   -c, --category <category>      - Task category
+  -r, --repeat <rule>            - Repeat: daily, weekly, monthly, yearly,
+                                   "every 2 weeks" or "cron <day> <month> <weekday>"
 
 Options for list:
   --priority <level>             - Filter by priority
   --status <status>              - Filter by status (complete/incomplete)
   --category <category>          - Filter by category
+  --upcoming <n>                 - Show the next n incomplete tasks due
+  --overdue                      - Show incomplete tasks past their due date
+  --from <date> --to <date>      - Show tasks due in a date range, with every
+                                   occurrence of recurring tasks (default: 30 days)
+  --sort <order>                 - Sort by id, priority, due or created
+  --limit <n>                    - Show at most n tasks
+  --offset <n>                   - Skip the first n tasks
+  --cursor <token>               - Continue from a previous page
+
+Options for list and search:
+  --format <format>              - Output as table, plain, csv or jsonl
+
+Options for import and export:
+  --format <format>              - csv or jsonl (default: from the file name)
+  --priority, --status, --category - Export only matching tasks
 
 Examples:
   add "Buy groceries" -p High -d 2023-12-10
+  add "Water plants" -d 2024-01-06 -r "every 3 days"
   list --priority High
   list --status incomplete
+  list --upcoming 10
+  list --from 2024-01-01 --to 2024-01-31
+  list --sort due --limit 20
+  list --format csv
   complete 1
   search "groceries"
 """
@@ -218,7 +1305,11 @@ Examples:
     
     def parse_command(self, command: str) -> tuple:
         """Parse user command and return (action, args, options)."""
-        parts = command.strip().split()
+        try:
+            parts = tokenize(command)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return None, [], {}
         if not parts:
             return None, [], {}
         
@@ -228,44 +1319,29 @@ Examples:
         
         i = 1
         while i < len(parts):
-            if parts[i].startswith('-'):
-                if parts[i] in ['-p', '--priority']:
-                    if i + 1 < len(parts):
-                        options['priority'] = parts[i + 1]
-                        i += 2
-                    else:
-                        print("Error: Priority level required")
-                        return None, [], {}
-                elif parts[i] in ['-d', '--due-date']:
-                    if i + 1 < len(parts):
-                        options['due_date'] = parts[i + 1]
-                        i += 2
-                    else:
-                        print("Error: Due date required")
-                        return None, [], {}
-                elif parts[i] in ['-c', '--category']:
-                    if i + 1 < len(parts):
-                        options['category'] = parts[i + 1]
-                        i += 2
-                    else:
-                        print("Error: Category required")
-                        return None, [], {}
-                elif parts[i] == '--status':
-                    if i + 1 < len(parts):
-                        options['status'] = parts[i + 1]
-                        i += 2
-                    else:
-                        print("Error: Status required")
-                        return None, [], {}
+            part = parts[i]
+            # A lone '-' is an argument (stdin or stdout), not an option
+            if part.startswith('-') and part != '-':
+                spec = OPTION_FLAGS.get(part)
+                if spec is None:
+                    print(f"Error: Unknown option {part}")
+                    return None, [], {}
+                if not spec.takes_value:
+                    options[spec.name] = True
+                    i += 1
+                elif i + 1 < len(parts):
+                    options[spec.name] = parts[i + 1]
+                    i += 2
                 else:
-                    print(f"Error: Unknown option {parts[i]}")
+                    print(f"Error: {spec.missing}")
                     return None, [], {}
             else:
-                args.append(parts[i])
+                args.append(part)
                 i += 1
         
         return action, args, options
     
+    @command('add', ('priority', 'due_date', 'category', 'recurrence'))
     def handle_add(self, args: List[str], options: Dict):
         """Handle add command."""
         if not args:
@@ -273,44 +1349,111 @@ Examples:
             return
         
         description = ' '.join(args)
-        priority = options.get('priority', 'Medium')
-        due_date = options.get('due_date')
-        category = options.get('category', 'General')
+        priority = options.get('priority') or 'Medium'
+        due_date = options.get('due_date') or None
+        category = options.get('category') or 'General'
+        recurrence = options.get('recurrence')
         
-        # Validate priority
-        if priority not in ['High', 'Medium', 'Low']:
-            print("Error: Priority must be High, Medium, or Low")
+        # Validate priority, due date and category
+        mask = self.task_manager.validator.check([priority], [due_date], [category])[0]
+        if mask:
+            print(f"Error: {TaskValidator.first_error(mask)}")
             return
         
-        # Validate due date format
-        if due_date:
+        # Validate recurrence rule
+        if recurrence:
             try:
-                datetime.strptime(due_date, '%Y-%m-%d')
-            except ValueError:
-                print("Error: Due date must be in YYYY-MM-DD format")
+                parse_recurrence(recurrence)
+            except ValueError as e:
+                print(f"Error: {e}")
                 return
         
-        task = self.task_manager.add_task(description, priority, due_date, category)
+        task = self.task_manager.add_task(description, priority, due_date, category, recurrence)
         print(f"Task added successfully! ID: {task.id}")
     
+    @command('list', ('priority', 'status', 'category', 'upcoming', 'overdue', 'from_date',
+                   'to_date', 'sort', 'limit', 'offset', 'cursor', 'format'))
     def handle_list(self, args: List[str], options: Dict):
         """Handle list command."""
         priority = options.get('priority')
         status = options.get('status')
         category = options.get('category')
         
-        tasks = self.task_manager.list_tasks(priority, status, category)
+        paging = [name for name in ('sort', 'limit', 'offset', 'cursor') if name in options]
+        next_cursor = None
+        renderer = self._renderer(options)
+        if renderer is None:
+            return
         
-        if not tasks:
+        dated = [name for name in ('upcoming', 'overdue', 'from_date', 'to_date')
+                 if options.get(name)]
+        if dated:
+            if paging:
+                print("Error: --upcoming, --overdue, --from and --to cannot be sorted or paged")
+                return
+            # --from and --to together make one date range
+            if len({'range' if name.endswith('_date') else name for name in dated}) > 1:
+                print("Error: Use only one of --upcoming, --overdue and --from/--to")
+                return
+            if status and status.lower() != "incomplete":
+                print("Error: Upcoming and overdue tasks are always incomplete")
+                return
+            if 'from_date' in dated or 'to_date' in dated:
+                try:
+                    start = (date.fromisoformat(options['from_date']) if 'from_date' in options
+                             else date.today())
+                    end = (date.fromisoformat(options['to_date']) if 'to_date' in options
+                           else start + timedelta(days=30))
+                except ValueError:
+                    print("Error: Dates must be in YYYY-MM-DD format")
+                    return
+                tasks = self.task_manager.occurrences(start, end, priority, category)
+            elif options.get('overdue'):
+                tasks = self.task_manager.overdue(priority=priority, category=category)
+            else:
+                try:
+                    count = int(options['upcoming'])
+                except ValueError:
+                    print("Error: --upcoming needs a number of tasks")
+                    return
+                tasks = self.task_manager.upcoming(count, priority=priority, category=category)
+        elif paging:
+            try:
+                limit = int(options['limit']) if 'limit' in options else None
+                offset = int(options.get('offset', 0))
+            except ValueError:
+                print("Error: --limit and --offset need whole numbers")
+                return
+            sort = options.get('sort', 'id').lower()
+            try:
+                tasks, next_cursor = self.task_manager.list_page(
+                    priority, status, category, sort, limit, offset, options.get('cursor'))
+            except ValueError as e:
+                print(f"Error: {e}")
+                return
+        else:
+            tasks = self.task_manager.list_tasks(priority, status, category)
+        
+        if not tasks and renderer.for_people:
             print("No tasks found.")
             return
         
-        print(f"\n{'ID':2s} | {'Status':6s} | {'Priority':8s} | {'Due Date':10s} | Description")
-        print("-" * 80)
+        renderer.render(tasks)
         
-        for task in tasks:
-            print(task)
+        if next_cursor:
+            # Keep machine-readable output clean
+            hint = sys.stdout if renderer.for_people else sys.stderr
+            print(f"\nMore tasks: repeat the command with --cursor {next_cursor}", file=hint)
     
+    def _renderer(self, options: Dict) -> Optional[TaskRenderer]:
+        """Create a renderer for the --format option, or print an error and return None."""
+        try:
+            return TaskRenderer(options.get('format', self.output_format).lower())
+        except ValueError as e:
+            print(f"Error: {e}")
+            return None
+    
+    @command('complete')
     def handle_complete(self, args: List[str], options: Dict):
         """Handle complete command."""
         if not args:
@@ -326,6 +1469,7 @@ Examples:
         except ValueError:
             print("Error: Task ID must be a number")
     
+    @command('uncomplete')
     def handle_uncomplete(self, args: List[str], options: Dict):
         """Handle uncomplete command."""
         if not args:
@@ -341,6 +1485,7 @@ Examples:
         except ValueError:
             print("Error: Task ID must be a number")
     
+    @command('delete')
     def handle_delete(self, args: List[str], options: Dict):
         """Handle delete command."""
         if not args:
@@ -356,26 +1501,104 @@ Examples:
         except ValueError:
             print("Error: Task ID must be a number")
     
+    @command('undo')
+    def handle_undo(self, args: List[str], options: Dict):
+        """Handle undo command."""
+        try:
+            if self.task_manager.undo():
+                print("Undone.")
+            else:
+                print("Error: Nothing to undo")
+        except RuntimeError as e:
+            print(f"Error: {e}")
+    
+    @command('redo')
+    def handle_redo(self, args: List[str], options: Dict):
+        """Handle redo command."""
+        try:
+            if self.task_manager.redo():
+                print("Redone.")
+            else:
+                print("Error: Nothing to redo")
+        except RuntimeError as e:
+            print(f"Error: {e}")
+    
+    @command('search', ('format',))
     def handle_search(self, args: List[str], options: Dict):
         """Handle search command."""
         if not args:
             print("Error: Search query required")
             return
         
+        renderer = self._renderer(options)
+        if renderer is None:
+            return
+        
         query = ' '.join(args)
         tasks = self.task_manager.search_tasks(query)
         
-        if not tasks:
+        if not tasks and renderer.for_people:
             print(f"No tasks found matching '{query}'")
             return
         
-        print(f"\nSearch results for '{query}':")
-        print(f"{'ID':2s} | {'Status':6s} | {'Priority':8s} | {'Due Date':10s} | Description")
-        print("-" * 80)
-        
-        for task in tasks:
-            print(task)
+        renderer.render(tasks, title=f"Search results for '{query}':")
+    
+    @command('import', ('format',))
+    def handle_import(self, args: List[str], options: Dict):
+        """Handle import command."""
+        if not args:
+            print("Error: File to import required")
+            return
+        path = args[0]
+        try:
+            fmt = format_for(path, options.get('format'))
+            start = time.perf_counter()
+            with self._open(path, 'r') as f:
+                added, rejected = self.task_manager.import_tasks(read_tasks(f, fmt))
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            return
+        seconds = time.perf_counter() - start
+        records = added + len(rejected)
+        print(f"Imported {added} tasks from {records} records in {seconds:.2f} s "
+              f"({records / max(seconds, 1e-9):,.0f} records/s)")
+        for number, error in rejected[:10]:
+            print(f"  Skipped record {number}: {error}")
+        if len(rejected) > 10:
+            print(f"  ...and {len(rejected) - 10} more skipped records")
     
+    @command('export', ('format', 'priority', 'status', 'category'))
+    def handle_export(self, args: List[str], options: Dict):
+        """Handle export command."""
+        if not args:
+            print("Error: File to export to required")
+            return
+        path = args[0]
+        try:
+            fmt = format_for(path, options.get('format'))
+            tasks = self.task_manager.list_tasks(options.get('priority'), options.get('status'),
+                                                 options.get('category'))
+            start = time.perf_counter()
+            with self._open(path, 'w') as f:
+                written = write_tasks(f, tasks, fmt)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            return
+        seconds = time.perf_counter() - start
+        # Keep exported data on stdout clean
+        report = sys.stderr if path == '-' else sys.stdout
+        print(f"Exported {written} tasks in {seconds:.2f} s "
+              f"({written / max(seconds, 1e-9):,.0f} records/s)", file=report)
+    
+    @staticmethod
+    def _open(path: str, mode: str) -> ContextManager[IO]:
+        """Open a file for import or export; '-' means stdin or stdout."""
+        if path == '-':
+            return nullcontext(sys.stdin if mode == 'r' else sys.stdout)
+        # newline='' leaves CSV line endings to the csv module
+        return open(path, mode, encoding='utf-8', newline='')
+    
+    @command('stats')
     def handle_stats(self, args: List[str], options: Dict):
         """Handle stats command."""
         stats = self.task_manager.get_statistics()
@@ -393,7 +1616,26 @@ Examples:
         if stats['categories']:
             print("\nBy Category:")
             for category, count in stats['categories'].items():
-                print(f"  {category}: {count}")
+                done = stats['categories_completed'].get(category, 0)
+                print(f"  {category}: {count} ({done} completed)")
+    
+    def execute(self, command: str):
+        """Parse and run one command line."""
+        action, args, options = self.parse_command(command)
+        if action is None:
+            return
+        
+        entry = COMMANDS.get(action)
+        if entry is None:
+            print(f"Error: Unknown command '{action}'. Type 'help' for available commands.")
+            return
+        
+        handler, accepted = entry
+        for name in options:
+            if name not in accepted:
+                print(f"Error: {OPTION_NAMES[name].flags[-1]} cannot be used with '{action}'")
+                return
+        handler(self, args, options)
     
     def run(self):
         """Run the main application loop."""
@@ -406,43 +1648,88 @@ Examples:
                 if not command:
                     continue
                 
-                action, args, options = self.parse_command(command)
-                
-                if action == 'quit':
-                    print("Goodbye!")
-                    self.running = False
-                elif action == 'help':
-                    self.display_help()
-                elif action == 'add':
-                    self.handle_add(args, options)
-                elif action == 'list':
-                    self.handle_list(args, options)
-                elif action == 'complete':
-                    self.handle_complete(args, options)
-                elif action == 'uncomplete':
-                    self.handle_uncomplete(args, options)
-                elif action == 'delete':
-                    self.handle_delete(args, options)
-                elif action == 'search':
-                    self.handle_search(args, options)
-                elif action == 'stats':
-                    self.handle_stats(args, options)
-                elif action is None:
-                    continue
-                else:
-                    print(f"Error: Unknown command '{action}'. Type 'help' for available commands.")
+                # Show changes made by other processes since the last command
+                self.task_manager.refresh()
+                self.execute(command)
             
             except KeyboardInterrupt:
                 print("\n\nGoodbye!")
                 self.running = False
             except Exception as e:
                 print(f"Error: {e}")
+    
+    def run_batch(self, lines: Iterable[str], report: bool = True) -> List[Tuple[str, float]]:
+        """Run commands non-interactively, one per line, and time each one.
+        
+        Blank lines and lines starting with '#' are skipped, and 'quit'
+        stops early. All the commands run in one transaction, so storage is
+        written once at the end instead of after every change; each command
+        is still its own step for 'undo' and 'redo'. Timings are
+        printed to stderr if ``report`` is set and returned as (command, seconds).
+        """
+        timings = []
+        start = time.perf_counter()
+        with self.task_manager.transaction(steps=True):
+            for line in lines:
+                command = line.strip()
+                if not command or command.startswith('#'):
+                    continue
+                command_start = time.perf_counter()
+                try:
+                    self.execute(command)
+                except Exception as e:
+                    print(f"Error: {e}")
+                timings.append((command, time.perf_counter() - command_start))
+                if not self.running:
+                    break
+            flush_start = time.perf_counter()
+        flush_seconds = time.perf_counter() - flush_start
+        total_seconds = time.perf_counter() - start
+        
+        if report:
+            sys.stderr.write(''.join(f"{seconds * 1000:10.3f} ms  {command}\n"
+                                     for command, seconds in timings))
+            sys.stderr.write(f"{len(timings)} commands in {total_seconds * 1000:.1f} ms "
+                             f"(saving took {flush_seconds * 1000:.1f} ms)\n")
+        return timings
 
 
 def main():
     """Main entry point."""
-    app = TodoApp()
-    app.run()
+    parser = argparse.ArgumentParser(description="Command-line todo list manager")
+    parser.add_argument('--data-file',
+                        help="Path of the task data file (default depends on --storage)")
+    parser.add_argument('--columnar', action='store_true',
+                        help="Keep a columnar copy of the tasks for list/stats scans")
+    parser.add_argument('--storage', choices=sorted(STORAGE_BACKENDS), default='json',
+                        help="Storage backend (json rewrites the file, journal appends changes, "
+                             "sqlite updates single rows, sharded rewrites one category's file)")
+    parser.add_argument('--fsync', choices=FSYNC_POLICIES, default='always',
+                        help="When to force writes to disk")
+    parser.add_argument('--compact', action='store_true',
+                        help="Write JSON without indentation")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='table',
+                        help="Default output format for list and search")
+    parser.add_argument('--batch', metavar='FILE',
+                        help="Run the commands in FILE ('-' for stdin) instead of prompting")
+    options = parser.parse_args()
+    
+    storage_options = {'fsync': options.fsync}
+    if options.compact:
+        storage_options['compact'] = True
+    data_file = options.data_file or DEFAULT_DATA_FILES[options.storage]
+    storage = create_storage(options.storage, data_file, **storage_options)
+    app = TodoApp(TaskManager(data_file, storage, options.columnar), options.format)
+    try:
+        if options.batch == '-':
+            app.run_batch(sys.stdin)
+        elif options.batch:
+            with open(options.batch) as commands:
+                app.run_batch(commands)
+        else:
+            app.run()
+    finally:
+        storage.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Todo List Server
+A local HTTP/JSON API that keeps one TaskManager in memory for many clients.
+
+The server process is the single owner of the task data: requests are
+served from memory on one asyncio event loop, so there is no locking or
+reloading per request. Changes are written behind: they are applied in
+memory and acknowledged at once, then written to storage together every
+``flush_interval`` seconds (or sooner once ``max_pending`` changes are
+waiting). A crash can lose at most the changes of the last interval.
+Each request takes the storage lock. A request that leaves changes in
+memory keeps the lock until they are written, so other processes that
+use the same data file wait for at most one flush, never write over
+unsaved changes, and have their own changes picked up by the next request.
+
+Endpoints (request and response bodies are JSON):
+
+    GET    /tasks                 list; query: priority, status, category,
+                                  sort, limit, offset, cursor
+    POST   /tasks                 add one task, or a list of tasks at once
+    GET    /tasks/<id>            one task
+    PATCH  /tasks/<id>            change fields of a task
+    DELETE /tasks/<id>            delete a task
+    POST   /tasks/<id>/complete   mark complete
+    POST   /tasks/<id>/uncomplete mark incomplete
+    GET    /search?q=<text>       search descriptions (all=1: every word)
+    GET    /stats                 statistics
+
+Run it with:
+    python todo_server.py --port 8765 --storage journal
+"""
+
+import argparse
+import asyncio
+import json
+import signal
+import time
+from contextlib import ExitStack
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from storage import DEFAULT_DATA_FILES, FSYNC_POLICIES, STORAGE_BACKENDS, create_storage
+from todo_app import Task, TaskManager
+from validation import TaskValidator
+
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 16 * 1024 * 1024
+# Invalid tasks of a batch named in the error before the rest are only counted
+MAX_REPORTED_ERRORS = 10
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    """An error reported to the client with an HTTP status code."""
+    
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_task_fields(records: List, validator: TaskValidator) -> List[Dict]:
+    """Check the bodies of new tasks in one pass and return add_task() arguments for each."""
+    masks = validator.check_records(records)
+    if any(masks):
+        if len(records) == 1:
+            raise HttpError(400, TaskValidator.first_error(masks[0]))
+        errors = [f"task {number}: {TaskValidator.first_error(mask)}"
+                  for number, mask in enumerate(masks) if mask]
+        if len(errors) > MAX_REPORTED_ERRORS:
+            errors[MAX_REPORTED_ERRORS:] = [f"{len(errors) - MAX_REPORTED_ERRORS} more"]
+        raise HttpError(400, "; ".join(errors))
+    fields = []
+    for data in records:
+        task = {'description': data['description'].strip(),
+                'priority': data.get('priority') or 'Medium',
+                'category': data.get('category') or 'General'}
+        if data.get('due_date'):
+            task['due_date'] = data['due_date']
+        if data.get('recurrence'):
+            task['recurrence'] = data['recurrence']
+        fields.append(task)
+    return fields
+
+
+class TodoServer:
+    """Serves a TaskManager over HTTP with write-behind persistence."""
+    
+    def __init__(self, task_manager: TaskManager, host: str = "127.0.0.1", port: int = 8765,
+                 flush_interval: float = 0.05, max_pending: int = 1000):
+        self.task_manager = task_manager
+        # Changes wait in memory until the flusher writes them
+        self.task_manager.autoflush = False
+        self.host = host
+        self.port = port
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.flushes = 0
+        self._wake_flusher = asyncio.Event()
+        self._stopping: Optional[asyncio.Event] = None
+        # Holds the storage lock from a request until its changes are flushed
+        self._lock_hold: Optional[ExitStack] = None
+        # Open connections, keyed by the task serving each one
+        self._connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+    
+    async def serve(self):
+        """Accept connections until stop() or a signal, then write any pending changes."""
+        self._stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signal_number, self._stopping.set)
+            except NotImplementedError:  # Windows; Ctrl+C still interrupts asyncio.run()
+                pass
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                            limit=MAX_HEADER_BYTES)
+        self.port = server.sockets[0].getsockname()[1]
+        flusher = asyncio.create_task(self._flush_loop())
+        print(f"Serving tasks on http://{self.host}:{self.port}/", flush=True)
+        try:
+            await self._stopping.wait()
+        finally:
+            server.close()
+            # Closing the connections ends their handlers at the next read
+            for writer in list(self._connections.values()):
+                writer.close()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            flusher.cancel()
+            self.flush()
+    
+    def stop(self):
+        """Ask serve() to finish."""
+        self._stopping.set()
+    
+    def flush(self):
+        """Write the pending changes to storage and release the storage lock."""
+        if self.task_manager.pending_count:
+            self.task_manager.flush()
+            self.flushes += 1
+        self._release_lock()
+    
+    def _hold_lock(self):
+        """Take the storage lock, if not held already, and pick up other processes' changes."""
+        if self._lock_hold is None:
+            hold = ExitStack()
+            hold.enter_context(self.task_manager.storage.lock())
+            self._lock_hold = hold
+            self.task_manager.refresh()
+    
+    def _release_lock(self):
+        """Let other processes use the data file again."""
+        if self._lock_hold is not None:
+            hold, self._lock_hold = self._lock_hold, None
+            hold.close()
+    
+    async def _flush_loop(self):
+        """Write pending changes every flush_interval, or early when many are waiting."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake_flusher.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake_flusher.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # Keep serving; the changes stay pending and are retried next time
+                print(f"Error: could not save tasks: {e}", flush=True)
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter):
+        """Serve requests on one connection until the client closes it."""
+        self._connections[asyncio.current_task()] = writer
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                try:
+                    status, payload = self.dispatch(method, target, body)
+                except HttpError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception as e:
+                    status, payload = 500, {'error': str(e)}
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(self._response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+                if self.task_manager.pending_count >= self.max_pending:
+                    self._wake_flusher.set()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except HttpError as e:
+            writer.write(self._response(e.status, {'error': str(e)}, False))
+        finally:
+            del self._connections[asyncio.current_task()]
+            writer.close()
+    
+    async def _read_request(self, reader: asyncio.StreamReader
+                            ) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        """Read one request; returns None when the client has closed the connection."""
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError as e:
+            if e.partial.strip():
+                raise HttpError(400, "Incomplete request")
+            return None
+        except asyncio.LimitOverrunError:
+            raise HttpError(413, "Request headers too large") from None
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, _ = lines[0].split(' ', 2)
+        except ValueError:
+            raise HttpError(400, "Malformed request line") from None
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HttpError(400, "Invalid Content-Length") from None
+        if length > MAX_BODY_BYTES:
+            raise HttpError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target, headers, body
+    
+    @staticmethod
+    def _response(status: int, payload, keep_alive: bool) -> bytes:
+        """Encode a JSON response."""
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        return head.encode('latin-1') + body
+    
+    def dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, object]:
+        """Route a request to a TaskManager call; returns (status, JSON payload).
+        
+        The storage lock is released afterwards unless the request left
+        changes waiting for flush(), which then releases it.
+        """
+        self._hold_lock()
+        try:
+            return self._route(method, target, body)
+        finally:
+            if not self.task_manager.pending_count:
+                self._release_lock()
+    
+    def _route(self, method: str, target: str, body: bytes) -> Tuple[int, object]:
+        """Run the TaskManager call a request asks for."""
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        segments = [segment for segment in url.path.split('/') if segment]
+        data = None
+        if body:
+            try:
+                data = json.loads(body)
+            except ValueError:
+                raise HttpError(400, "Request body is not valid JSON") from None
+        manager = self.task_manager
+        
+        if segments == ['tasks']:
+            if method == 'GET':
+                return 200, self._list(query)
+            if method == 'POST':
+                if isinstance(data, list):
+                    # Many tasks in one request are added as one batch
+                    tasks = manager.add_tasks(parse_task_fields(data, manager.validator))
+                    return 201, {'tasks': [task.to_dict() for task in tasks]}
+                fields, = parse_task_fields([data], manager.validator)
+                return 201, manager.add_task(**fields).to_dict()
+            raise HttpError(405, f"{method} is not allowed on /tasks")
+        
+        if segments and segments[0] == 'tasks' and len(segments) in (2, 3):
+            task = self._task(segments[1])
+            action = segments[2] if len(segments) == 3 else None
+            if action is None and method == 'GET':
+                return 200, task.to_dict()
+            if action is None and method == 'DELETE':
+                manager.delete_task(task.id)
+                return 200, {'deleted': task.id}
+            if action is None and method == 'PATCH':
+                if not isinstance(data, dict):
+                    raise HttpError(400, "PATCH needs a JSON object of fields")
+                try:
+                    manager.update_task(task.id, **data)
+                except (TypeError, ValueError) as e:
+                    raise HttpError(400, str(e)) from None
+                return 200, task.to_dict()
+            if action in ('complete', 'uncomplete') and method == 'POST':
+                manager.update_task(task.id, completed=action == 'complete')
+                return 200, task.to_dict()
+            raise HttpError(405, f"{method} is not allowed on {url.path}")
+        
+        if segments == ['search'] and method == 'GET':
+            if not query.get('q'):
+                raise HttpError(400, "Search needs a 'q' parameter")
+            tasks = manager.search_tasks(query['q'], query.get('all') in ('1', 'true'))
+            return 200, {'tasks': [task.to_dict() for task in tasks]}
+        
+        if segments == ['stats'] and method == 'GET':
+            return 200, manager.get_statistics()
+        
+        raise HttpError(404, f"No such endpoint: {method} {url.path}")
+    
+    def _task(self, segment: str) -> Task:
+        """Look up the task named in a URL."""
+        try:
+            task = self.task_manager.get_task(int(segment))
+        except ValueError:
+            task = None
+        if task is None:
+            raise HttpError(404, f"Task with ID {segment} not found")
+        return task
+    
+    def _list(self, query: Dict[str, str]) -> Dict:
+        """Handle GET /tasks."""
+        filters = (query.get('priority'), query.get('status'), query.get('category'))
+        if not any(name in query for name in ('sort', 'limit', 'offset', 'cursor')):
+            return {'tasks': [task.to_dict() for task in self.task_manager.list_tasks(*filters)]}
+        try:
+            limit = int(query['limit']) if 'limit' in query else None
+            tasks, next_cursor = self.task_manager.list_page(
+                *filters, query.get('sort', 'id'), limit, int(query.get('offset', 0)),
+                query.get('cursor'))
+        except ValueError as e:
+            raise HttpError(400, str(e)) from None
+        return {'tasks': [task.to_dict() for task in tasks], 'next_cursor': next_cursor}
+
+
+def main():
+    """Run the server until interrupted."""
+    parser = argparse.ArgumentParser(description="HTTP/JSON server for the todo list")
+    parser.add_argument('--host', default="127.0.0.1", help="Address to listen on")
+    parser.add_argument('--port', type=int, default=8765, help="Port to listen on (0: any free port)")
+    parser.add_argument('--data-file',
+                        help="Path of the task data file (default depends on --storage)")
+    parser.add_argument('--storage', choices=sorted(STORAGE_BACKENDS), default='json',
+                        help="Storage backend")
+    parser.add_argument('--fsync', choices=FSYNC_POLICIES, default='always',
+                        help="When to force writes to disk")
+    parser.add_argument('--flush-interval', type=float, default=0.05,
+                        help="Seconds between writes of pending changes")
+    options = parser.parse_args()
+    
+    data_file = options.data_file or DEFAULT_DATA_FILES[options.storage]
+    storage = create_storage(options.storage, data_file, fsync=options.fsync)
+    server = TodoServer(TaskManager(data_file, storage), options.host, options.port,
+                        options.flush_interval)
+    started = time.perf_counter()
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        storage.close()
+        print(f"Stopped after {time.perf_counter() - started:.0f} s and {server.flushes} writes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Task Import and Export
+Streams tasks to and from CSV and JSON Lines files.
+
+Readers are generators that parse one row at a time, and export writes
+rows through TaskRenderer a batch at a time, so the size of a file never
+decides how much memory the transfer itself needs. Imported records are
+validated a batch at a time by TaskManager.import_tasks() (see
+validation.py).
+
+CSV files use the columns of rendering.CSV_COLUMNS (any order, extra
+columns ignored); JSON Lines files hold one task object per line, as
+written by ``export --format jsonl``.
+"""
+
+import csv
+import json
+from itertools import islice
+from typing import Dict, IO, Iterable, Iterator, List, Optional
+
+from rendering import TaskRenderer
+
+TRANSFER_FORMATS = ('csv', 'jsonl')
+
+# File extensions that imply a format
+EXTENSIONS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+# Spellings of the completed flag accepted in CSV files
+BOOLEANS = {'true': True, 'false': False, '1': True, '0': False, 'yes': True, 'no': False,
+            '': False}
+
+
+def format_for(path: str, requested: Optional[str] = None) -> str:
+    """The transfer format for a file: the requested one, or the one its extension implies."""
+    if requested:
+        fmt = requested.lower()
+    else:
+        dot = path.rfind('.')
+        fmt = EXTENSIONS.get(path[dot:].lower()) if dot > 0 else None
+        if fmt is None:
+            raise ValueError(f"Cannot tell the format of {path}; use --format csv or jsonl")
+    if fmt not in TRANSFER_FORMATS:
+        raise ValueError(f"Format must be one of {', '.join(TRANSFER_FORMATS)}")
+    return fmt
+
+
+def read_csv(stream: IO) -> Iterator[Dict]:
+    """Yield task records from CSV text with a header row."""
+    for row in csv.DictReader(stream):
+        record = {name: value for name, value in row.items() if name is not None}
+        completed = record.get('completed')
+        if completed is not None:
+            # Left as text if it is not a boolean, for validation to report
+            record['completed'] = BOOLEANS.get(completed.strip().lower(), completed)
+        for name in ('due_date', 'recurrence', 'created_date'):
+            if record.get(name) == '':
+                record[name] = None
+        yield record
+
+
+def read_jsonl(stream: IO) -> Iterator[Dict]:
+    """Yield task records from JSON Lines text; blank lines are skipped."""
+    for number, line in enumerate(stream, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Line {number} is not valid JSON: {e}") from None
+
+
+def read_tasks(stream: IO, fmt: str) -> Iterator[Dict]:
+    """Yield task records from a stream in one of TRANSFER_FORMATS."""
+    return read_csv(stream) if fmt == 'csv' else read_jsonl(stream)
+
+
+def write_tasks(stream: IO, tasks: Iterable, fmt: str, batch_size: int = 1000) -> int:
+    """Write tasks to a stream in one of TRANSFER_FORMATS; returns the number written."""
+    return TaskRenderer(fmt, stream, batch_size).render(tasks)
+
+
+def batches(records: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    """Split a stream of records into lists of at most ``size``."""
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,193 @@
+"""
+Task Validation
+Checks task fields for many rows at once and reports the problems as bit masks.
+
+Bulk imports repeat the same few priorities, categories, dates and
+recurrence rules over and over, so TaskValidator checks each distinct
+value once and remembers the answer in a lookup table. A column of values
+is then checked with one C-level pass over the table instead of a parse
+per row. Each row gets an integer mask with one bit per failed check
+(0 means valid); messages() turns a mask back into error messages.
+
+    validator = TaskValidator()
+    masks = validator.check(['High', 'Urgent'], ['2024-01-31', '2024-02-30'], ['Work', 'Home'])
+    # masks == [0, PRIORITY | DUE_DATE]
+"""
+
+import re
+from collections.abc import Hashable
+from datetime import date
+from itertools import compress
+from operator import methodcaller, not_
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from recurrence import parse_recurrence
+
+# One bit per check, in the order errors are reported
+RECORD = 1 << 0
+DESCRIPTION = 1 << 1
+PRIORITY = 1 << 2
+DUE_DATE = 1 << 3
+CATEGORY = 1 << 4
+COMPLETED = 1 << 5
+RECURRENCE = 1 << 6
+CREATED_DATE = 1 << 7
+
+MESSAGES = {
+    RECORD: "Record is not an object",
+    DESCRIPTION: "Task description required",
+    PRIORITY: "Priority must be High, Medium, or Low",
+    DUE_DATE: "Due date must be in YYYY-MM-DD format",
+    CATEGORY: "Category must be non-empty text",
+    COMPLETED: "Completed must be true or false",
+    RECURRENCE: "Unknown recurrence rule",
+    CREATED_DATE: "Created date must be in YYYY-MM-DD format",
+}
+
+# The bit of each task field
+FIELD_BITS = {'description': DESCRIPTION, 'priority': PRIORITY, 'due_date': DUE_DATE,
+              'category': CATEGORY, 'completed': COMPLETED, 'recurrence': RECURRENCE}
+
+PRIORITIES = ('High', 'Medium', 'Low')
+
+_DATE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+# Lookup tables stop remembering new values past this size
+MAX_REMEMBERED = 100_000
+
+
+class TaskValidator:
+    """Validates columns of task fields, remembering the verdict for each distinct value."""
+    
+    def __init__(self):
+        # Missing values (None or empty) mean "use the default" and are valid
+        self._priorities: Dict[object, bool] = {value: True for value in PRIORITIES}
+        self._priorities.update({None: True, '': True})
+        self._dates: Dict[object, bool] = {None: True, '': True}
+        self._categories: Dict[object, bool] = {None: True, '': True}
+        self._rules: Dict[object, bool] = {None: True, '': True}
+        # Table and check of each field checked by lookup
+        self._columns = {'priority': (self._priorities, _is_priority),
+                         'due_date': (self._dates, _is_date),
+                         'category': (self._categories, _is_category),
+                         'recurrence': (self._rules, _is_rule)}
+    
+    def check(self, priorities: Sequence, due_dates: Sequence,
+              categories: Sequence) -> List[int]:
+        """Check parallel columns of priorities, due dates and categories; returns a mask per row."""
+        masks = [0] * len(priorities)
+        self._mark(masks, PRIORITY, self._lookup(self._priorities, priorities, _is_priority))
+        self._mark(masks, DUE_DATE, self._lookup(self._dates, due_dates, _is_date))
+        self._mark(masks, CATEGORY, self._lookup(self._categories, categories, _is_category))
+        return masks
+    
+    def check_records(self, records: Sequence) -> List[int]:
+        """Check task records (dictionaries, as read by transfer.read_tasks); returns a mask per row."""
+        objects = [isinstance(record, dict) for record in records]
+        if not all(objects):
+            records = [record if is_object else {} for record, is_object in zip(records, objects)]
+        def column(name: str) -> List:
+            return list(map(methodcaller('get', name), records))
+        
+        masks = self.check(column('priority'), column('due_date'), column('category'))
+        self._mark(masks, RECORD, objects)
+        self._mark(masks, DESCRIPTION, list(map(_is_description, column('description'))))
+        self._mark(masks, COMPLETED, [value is None or value is True or value is False
+                                      for value in column('completed')])
+        self._mark(masks, RECURRENCE, self._lookup(self._rules, column('recurrence'), _is_rule))
+        self._mark(masks, CREATED_DATE, self._lookup(self._dates, column('created_date'), _is_date))
+        for position in compress(range(len(masks)), map(not_, objects)):
+            # Nothing else can be checked in a record that is not an object
+            masks[position] = RECORD
+        return masks
+    
+    def check_update(self, fields: Dict) -> int:
+        """Check the fields given to TaskManager.update_task(); returns their mask.
+        
+        Only the fields given are checked. Unlike a new task's, they cannot
+        be left empty to take a default, except the due date and recurrence
+        rule, which an empty value clears.
+        """
+        mask = 0
+        for name, value in fields.items():
+            if name == 'description':
+                valid = _is_description(value)
+            elif name == 'completed':
+                valid = value is True or value is False
+            elif name in self._columns:
+                table, check = self._columns[name]
+                valid = self._lookup(table, [value], check)[0] and (
+                    value not in (None, '') or name in ('due_date', 'recurrence'))
+            else:
+                continue
+            if not valid:
+                mask |= FIELD_BITS[name]
+        return mask
+    
+    @staticmethod
+    def messages(mask: int) -> List[str]:
+        """The error messages for a mask, most important first."""
+        return [message for bit, message in MESSAGES.items() if mask & bit]
+    
+    @staticmethod
+    def first_error(mask: int) -> Optional[str]:
+        """The most important error message for a mask, or None if the row is valid."""
+        for bit, message in MESSAGES.items():
+            if mask & bit:
+                return message
+        return None
+    
+    @staticmethod
+    def _mark(masks: List[int], bit: int, valid: Iterable[bool]):
+        """Set ``bit`` in the masks of the rows that are not valid."""
+        for position in compress(range(len(masks)), map(not_, valid)):
+            masks[position] |= bit
+    
+    @staticmethod
+    def _lookup(table: Dict[object, bool], values: Sequence,
+                check: Callable[[object], bool]) -> List[bool]:
+        """Look every value up in ``table``, checking (and remembering) values not seen before."""
+        try:
+            unseen = set(values).difference(table)
+        except TypeError:
+            # Lists or other unhashable values (from JSON): check them one by one
+            return [table[value] if isinstance(value, Hashable) and value in table
+                    else check(value) for value in values]
+        if unseen:
+            if len(table) + len(unseen) > MAX_REMEMBERED:
+                verdicts = {value: check(value) for value in unseen}
+                return [table[value] if value in table else verdicts[value] for value in values]
+            for value in unseen:
+                table[value] = check(value)
+        return list(map(table.__getitem__, values))
+
+
+def _is_priority(value) -> bool:
+    return value in PRIORITIES
+
+
+def _is_date(value) -> bool:
+    """Whether a value is a real calendar date written as YYYY-MM-DD."""
+    if not isinstance(value, str) or not _DATE.fullmatch(value):
+        return False
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_category(value) -> bool:
+    return isinstance(value, str) and bool(value.strip())
+
+
+def _is_rule(value) -> bool:
+    try:
+        parse_recurrence(value)
+    except (AttributeError, TypeError, ValueError):
+        return False
+    return True
+
+
+def _is_description(value) -> bool:
+    return isinstance(value, str) and bool(value.strip())